@@ -7,16 +7,26 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import streamlit as st
-from config import DATA_DIR, UPLOAD_DIR
+from config import DATA_DIR, UPLOAD_DIR, WARMUP_MODELS, EMBEDDING_MODEL, DEDUP_ENABLED, DEDUP_THRESHOLD, SNAPSHOT_PATH
 
 from components.data_collection import load_pdf
-from components.cleaning import clean_text
-from components.chunking import chunk_text_with_method, CHUNKING_METHODS
-from components.embedding import embed_chunks
-from components.storage import store_embeddings, get_stored_content
+from components.cleaning import clean_pages
+from components.chunking import chunk_table, CHUNKING_METHODS
+from components.dedup import dedup_chunks
+from components.embedding import encode_texts
+from components.storage import get_stored_content, delete_collection, warm_up as warm_up_storage
+from components.ingestion import index_chunks
+from components import jobs
 from components.retrieval import retrieve_with_method, RETRIEVER_METHODS
-from components.generation import generate_answer
-from components.llm_azure import is_azure_configured, generate_with_azure
+from components.generation import generate_answer, count_tokens
+from components.llm_azure import is_azure_configured, stream_with_azure
+from components.model_registry import warm_up_async, get_stats as get_model_stats
+from components.pipeline_cache import content_hash, run_stage
+from components.embedding_cache import get_stats as get_embedding_cache_stats
+from components import answer_cache
+from components import metrics
+from components import namespaces
+from components import snapshot
 
 # Ensure dirs exist
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -57,6 +67,12 @@ with st.sidebar:
     )
     chunk_size = st.select_slider("Chunk size (chars)", options=[300, 500, 700, 1000], value=500, key="chunk_size")
     chunk_overlap = st.select_slider("Chunk overlap (chars)", options=[0, 50, 100], value=50, key="chunk_overlap")
+    dedup_threshold = st.select_slider(
+        "Drop near-duplicate chunks (similarity ≥)",
+        options=["off", 0.7, 0.8, 0.85, 0.9, 0.95],
+        value=DEDUP_THRESHOLD if DEDUP_ENABLED else "off",
+        key="dedup_threshold",
+    )
     retriever_method = st.selectbox(
         "Retriever",
         options=list(RETRIEVER_METHODS.keys()),
@@ -64,6 +80,41 @@ with st.sidebar:
         key="retriever_method",
     )
     top_k = st.selectbox("Top-K chunks to retrieve", options=[1, 3, 5, 10], index=1, key="top_k")
+    _model_stats = get_model_stats()
+    st.caption(
+        f"Model registry: {len(_model_stats['resident'])} loaded ({_model_stats['resident_mb']} MB), "
+        f"hits {_model_stats['hits']}, misses {_model_stats['misses']}, evictions {_model_stats['evictions']}."
+        + (" Warming up in the background…" if _model_stats["warming_up"] else "")
+    )
+    if _model_stats["warmup_error"]:
+        st.caption(f"Background warm-up failed: {_model_stats['warmup_error']}")
+    _ns_stats = namespaces.get_stats()
+    st.caption(
+        f"Document indexes: {_ns_stats['collections']} ({_ns_stats['chunks']} chunks, ~{_ns_stats['size_mb']} MB); "
+        f"expired {_ns_stats['evicted_ttl']}, evicted {_ns_stats['evicted_lru']}."
+    )
+    # Prebuilt index shipped with the app: ready to query before anything is uploaded
+    if os.path.isdir(SNAPSHOT_PATH):
+        # Loaded in the background: importing into ChromaDB rebuilds its HNSW index
+        _snapshot = snapshot.load_async(SNAPSHOT_PATH)
+        if _snapshot["status"] == "loading":
+            st.caption("Loading the prebuilt index in the background…")
+        elif _snapshot["status"] == "failed":
+            st.warning(f"Prebuilt index not loaded: {_snapshot['error']}")
+        elif _snapshot["status"] == "dropped":
+            # The background warm-up's verify_loaded found another local model and dropped it
+            st.warning(f"Prebuilt index dropped: {_snapshot['error']}")
+            if st.session_state.get("collection_name") == _snapshot["collection"]:
+                del st.session_state["collection_name"]
+        else:
+            if not st.session_state.get("collection_name"):
+                st.session_state["collection_name"] = _snapshot["collection"]
+            st.caption(
+                f"Prebuilt index: {_snapshot['count']} chunks from {', '.join(_snapshot['manifest']['sources']) or 'snapshot'} "
+                f"({'loaded' if _snapshot['imported'] else 'already present'} in {_snapshot['seconds']}s)."
+            )
+    # Display only, for this session: recording is process-wide and set by METRICS_ENABLED
+    show_metrics = st.checkbox("Show stage latency", value=True, key="show_metrics")
 
 st.divider()
 
@@ -75,15 +126,92 @@ pdf_file = st.file_uploader("Choose a PDF", type=["pdf"], key="pdf_upload")
 collected = None
 cleaned = None
 chunks = None
-embeddings = None
-stored_count = 0
+
+stage_hits = {}
+
+
+def _cache_note(stage: str) -> None:
+    if stage_hits.get(stage):
+        st.caption("♻️ Reused cached result (same file and settings).")
+
+
+def _index_job(job, chunks, collection_name: str, source: str) -> dict:
+    """
+    Background job: embed + store into the document's collection, then register it. The
+    collection only becomes visible (namespaces.exists) once complete, so sessions keep
+    querying their previous index until they swap to this one.
+    """
+    try:
+        result = index_chunks(
+            chunks, collection_name, model_name=EMBEDDING_MODEL, source=source,
+            progress=job.progress, check=job.check,
+        )
+    except Exception:
+        if not namespaces.exists(collection_name):
+            delete_collection(collection_name)  # half-built, nobody is using it
+        raise
+    size_bytes = sum(len(c["text"].encode("utf-8")) for c in chunks) + result["stored"] * result["dimensions"] * 4
+    namespaces.register(collection_name, source, result["stored"], size_bytes)
+    namespaces.evict(keep=(collection_name,))
+    return {**result, "collection_name": collection_name}
+
+
+def _index_progress() -> None:
+    """Progress of this session's indexing job; swaps the session to the new index when done."""
+    job = jobs.get(st.session_state["index_job"]) if "index_job" in st.session_state else None
+    if job is not None:
+        snap = job.snapshot()
+        if snap["status"] in jobs.ACTIVE:
+            st.caption(
+                f"Indexing **{snap['name']}** in the background ({snap['status']}, {snap['seconds']:.0f}s). "
+                "Questions still use the previous document until it finishes."
+            )
+            for stage, p in snap["stages"].items():
+                total = p["total"] or 0
+                st.progress(min(1.0, p["done"] / total) if total else 0.0, text=f"{stage}: {p['done']}/{total}")
+            if st.button("Cancel", key=f"cancel_job_{snap['id']}"):
+                jobs.cancel(snap["id"])
+            if not _fragment:
+                st.button("Refresh progress", key="refresh_job")
+            return
+        del st.session_state["index_job"]
+        st.session_state["index_result"] = snap
+        if snap["status"] == "done":
+            st.session_state["collection_name"] = snap["result"]["collection_name"]
+            st.session_state["stored"] = True
+            st.rerun()
+    snap = st.session_state.get("index_result")
+    if snap is None:
+        return
+    if snap["status"] == "done":
+        r = snap["result"]
+        st.success(f"Stored **{r['stored']}** chunks in the vector database ({snap['seconds']:.0f}s).")
+        st.caption(f"Added {r['added']}, kept {r['kept']} unchanged, deleted {r['deleted']}.")
+    elif snap["status"] == "cancelled":
+        st.warning("Indexing cancelled; the previous document is still active.")
+    else:
+        st.error(f"Indexing failed: {snap['error']}")
+
+
+# Re-render just the progress panel every second while the rest of the page stays put
+_fragment = getattr(st, "fragment", None)
+if _fragment:
+    _index_progress = _fragment(run_every=1.0)(_index_progress)
+
 
 if pdf_file:
+    file_bytes = pdf_file.getvalue()
+    file_key = content_hash(file_bytes)
     save_path = os.path.join(UPLOAD_DIR, pdf_file.name)
-    with open(save_path, "wb") as f:
-        f.write(pdf_file.getvalue())
+
+    def _load():
+        with open(save_path, "wb") as f:
+            f.write(file_bytes)
+        return load_pdf(save_path)
+
     with st.spinner("Loading PDF..."):
-        collected = load_pdf(save_path)
+        collected, stage_hits["load"] = run_stage("load", (file_key,), _load)
+    _cache_note("load")
     st.success(f"Loaded **{collected['metadata']['num_pages']}** pages, **{collected['metadata']['total_chars']}** characters.")
     with st.expander("View raw extracted text (first 1500 chars)"):
         st.text(collected["text"][:1500] + ("..." if len(collected["text"]) > 1500 else ""))
@@ -91,7 +219,8 @@ if pdf_file:
     st.divider()
     st.subheader("2️⃣ Cleaning")
     st.caption("Normalize whitespace and remove excess newlines.")
-    cleaned = clean_text(collected["text"])
+    cleaned, stage_hits["clean"] = run_stage("clean", (file_key,), lambda: clean_pages(collected["pages"]))
+    _cache_note("clean")
     st.metric("Characters after cleaning", cleaned["stats"]["cleaned_len"])
     st.caption(f"Removed {cleaned['stats']['removed_chars']} characters.")
     with st.expander("View cleaned text (first 1500 chars)"):
@@ -100,31 +229,81 @@ if pdf_file:
     st.divider()
     st.subheader("3️⃣ Chunking")
     st.caption(f"Method: **{CHUNKING_METHODS.get(chunking_method, ('fixed',))[0]}** — size={chunk_size}, overlap={chunk_overlap}.")
-    chunks = chunk_text_with_method(cleaned["text"], method=chunking_method, chunk_size=chunk_size, overlap=chunk_overlap)
+    chunk_key = (file_key, chunking_method, chunk_size, chunk_overlap)
+    chunks, stage_hits["chunk"] = run_stage(
+        "chunk", chunk_key,
+        lambda: chunk_table(
+            cleaned["text"], method=chunking_method, chunk_size=chunk_size, overlap=chunk_overlap,
+            page_starts=cleaned["page_starts"],
+        ),
+    )
+    _cache_note("chunk")
     st.metric("Number of chunks", len(chunks))
     for i, c in enumerate(chunks[:5]):
-        with st.expander(f"Chunk {c['index']} (preview)"):
+        with st.expander(f"Chunk {c['index']} (page {c.get('page', '?')}, preview)"):
             st.text(c["text"][:400] + ("..." if len(c["text"]) > 400 else ""))
     if len(chunks) > 5:
         st.caption(f"... and {len(chunks) - 5} more chunks.")
 
+    chunks_to_embed = chunks
+    if dedup_threshold != "off":
+        deduped, stage_hits["dedup"] = run_stage(
+            "dedup", chunk_key + (dedup_threshold,), lambda: dedup_chunks(chunks, threshold=dedup_threshold),
+        )
+        chunks_to_embed = chunks.select(deduped["kept"])
+        st.caption(
+            f"Near-duplicates: dropped **{deduped['dropped']}** of {deduped['total']} chunks "
+            f"({deduped['ratio']:.0%}) as ≥{dedup_threshold} similar to an earlier chunk."
+        )
+        if deduped["duplicates"]:
+            with st.expander("Dropped chunk → chunk kept in its place"):
+                for dropped, kept in list(deduped["duplicates"].items())[:50]:
+                    st.text(f"Chunk {dropped} → chunk {kept}")
+
     st.divider()
     st.subheader("4️⃣ Embedding")
-    st.caption("Convert each chunk to a vector using a small local model (sentence-transformers).")
-    with st.spinner("Computing embeddings..."):
-        embeddings = embed_chunks(chunks)
-    st.success(f"Embedded **{len(embeddings)}** chunks. Each vector has **{len(embeddings[0]['embedding'])}** dimensions.")
-    with st.expander("View first chunk's vector (first 20 dimensions)"):
-        st.code(str(embeddings[0]["embedding"][:20]) + "...")
+    st.caption(
+        "Convert each chunk to a vector using a small local model (sentence-transformers). "
+        "The whole document is embedded in the background when you click **Store** below."
+    )
+    if len(chunks_to_embed):
+        preview = encode_texts([chunks_to_embed[0]["text"]], EMBEDDING_MODEL)[0]
+        st.success(f"**{len(chunks_to_embed)}** chunks to embed. Each vector has **{len(preview)}** dimensions.")
+        with st.expander("View first chunk's vector (first 20 dimensions)"):
+            st.code(str([round(float(x), 4) for x in preview[:20]]) + "...")
+    _emb_cache = get_embedding_cache_stats()
+    if _emb_cache["hit_rate"] is not None:
+        st.caption(
+            f"Embedding cache: {_emb_cache['hit_rate']:.0%} of chunk lookups reused a stored vector "
+            f"({_emb_cache['entries']} vectors, {_emb_cache['size_mb']} MB on disk)."
+        )
 
     st.divider()
     st.subheader("5️⃣ Storage")
     st.caption("Store vectors in local ChromaDB (no server required).")
-    if st.button("Store in ChromaDB"):
-        with st.spinner("Storing..."):
-            stored_count = store_embeddings(embeddings)
-        st.success(f"Stored **{stored_count}** chunks in the vector database.")
+    # One collection per document + settings: other sessions' indexes are never touched, and a
+    # session uploading the same PDF with the same settings reuses the existing index
+    doc_collection = namespaces.collection_name_for(
+        file_key, chunking_method, chunk_size, chunk_overlap, dedup_threshold, EMBEDDING_MODEL,
+    )
+    if namespaces.exists(doc_collection) and st.session_state.get("collection_name") != doc_collection:
+        st.session_state["collection_name"] = doc_collection
         st.session_state["stored"] = True
+        st.info("This document is already indexed with these settings (shared with other sessions). You can ask questions right away.")
+    if st.button("Store in ChromaDB"):
+        job = jobs.submit(
+            ("index", doc_collection), _index_job, chunks_to_embed, doc_collection, pdf_file.name, name=pdf_file.name,
+        )
+        st.session_state["index_job"] = job.id
+        st.session_state.pop("index_result", None)
+
+    with st.sidebar:
+        st.caption(
+            "Stage cache this run: "
+            + ", ".join(f"{stage} {'hit' if hit else 'miss'}" for stage, hit in stage_hits.items())
+        )
+
+_index_progress()
 
 # Show what's currently in ChromaDB (works on Cloud too – this is the only way to "see" stored content)
 st.divider()
@@ -133,7 +312,7 @@ st.caption("On Cloud, data lives only in the running app’s memory; you can’t
 if st.button("Refresh / View stored chunks", key="view_db"):
     st.session_state["show_db"] = True
 if st.session_state.get("show_db"):
-    info = get_stored_content()
+    info = get_stored_content(st.session_state["collection_name"]) if st.session_state.get("collection_name") else None
     if info is None:
         st.warning("No collection yet, or database not available. Upload a PDF and click **Store in ChromaDB** first.")
     else:
@@ -168,37 +347,84 @@ answer_mode = st.radio(
 use_gpt4o = _use_azure and "GPT-4o" in answer_mode
 
 query = st.text_input("Your question", placeholder="e.g. What is the main topic?", key="query")
-if query:
+active_collection = st.session_state.get("collection_name")
+if query and not active_collection:
+    if os.path.isdir(SNAPSHOT_PATH) and snapshot.load_async(SNAPSHOT_PATH)["status"] == "loading":
+        st.info("The prebuilt index is still loading. Ask again in a moment.")
+    else:
+        st.warning("No document stored in this session yet. Upload a PDF and click **Store in ChromaDB** first.")
+elif query:
     try:
+        namespaces.touch(active_collection)
         with st.spinner("Retrieving..."):
-            retrieved = retrieve_with_method(query, method=retriever_method, top_k=top_k)
+            retrieved = retrieve_with_method(query, method=retriever_method, top_k=top_k, collection_name=active_collection)
         if not retrieved:
             st.warning("No chunks in the database. Upload a PDF and click **Store in ChromaDB** first.")
         else:
             st.metric("Chunks retrieved", len(retrieved))
-            score_label = "keyword score" if retriever_method == "keyword" else "distance"
+            if retrieved[0].get("skipped"):
+                st.warning(
+                    f"Hybrid retrieval ran without its {' and '.join(retrieved[0]['skipped'])} branch "
+                    "(timed out or failed); results may be less relevant."
+                )
+            is_keyword = retriever_method in ("keyword", "bm25", "hybrid")
+            score_label = {"hybrid": "fused score"}.get(retriever_method, "keyword score" if is_keyword else "distance")
             for i, r in enumerate(retrieved):
                 score_val = r.get("distance", "N/A")
-                if retriever_method == "keyword" and isinstance(score_val, (int, float)):
-                    score_val = -score_val
-                with st.expander(f"Retrieved chunk {i+1} ({score_label}: {score_val})"):
+                if is_keyword and isinstance(score_val, (int, float)):
+                    score_val = round(-score_val, 3)
+                page = (r.get("metadata") or {}).get("page")
+                page_note = f", page {page}" if page else ""
+                with st.expander(f"Retrieved chunk {i+1} ({score_label}: {score_val}{page_note})"):
                     st.text(r["text"])
             with st.spinner("Building answer..."):
                 out = generate_answer(query, retrieved)
             context = out["context_used"]
+            st.caption(
+                f"Context: {out['num_chunks']} chunks packed into {out['num_spans']} passages, "
+                f"{out['context_tokens']} tokens (from {out['raw_context_tokens']} before merging overlaps"
+                + (f"; {out['dropped_spans']} passages left out to fit the budget)." if out["dropped_spans"] else ").")
+            )
 
             if use_gpt4o:
-                with st.spinner("Calling GPT-4o..."):
-                    direct_answer, err = generate_with_azure(
-                        query, context,
-                        api_key=_azure_key, endpoint=_azure_endpoint,
-                        deployment=_azure_deployment, api_version=_azure_api_version,
+                st.subheader("Answer (GPT-4o)")
+                answer_box = st.empty()
+                direct_answer = ""
+                try:
+                    # Same context + near-identical question -> reuse the earlier answer
+                    query_vec = encode_texts([query], EMBEDDING_MODEL, use_cache=False)[0]
+                    cached_answer = answer_cache.lookup(
+                        query_vec, context, collection_name=active_collection, namespace=_azure_deployment,
                     )
-                if err:
-                    st.error(f"Azure OpenAI error: {err}")
-                else:
-                    st.subheader("Answer (GPT-4o)")
-                    st.success(direct_answer)
+                    if cached_answer:
+                        answer_box.success(cached_answer["answer"])
+                        st.caption(
+                            f"Served from answer cache (similarity {cached_answer['similarity']:.2f} to an earlier "
+                            f"question with the same context, {cached_answer['age']:.0f}s old)."
+                        )
+                    else:
+                        _llm_latency = {}  # this call's timing, not another session's
+                        with st.spinner("Calling GPT-4o..."):
+                            # Render tokens as they arrive
+                            for piece in stream_with_azure(
+                                query, context,
+                                api_key=_azure_key, endpoint=_azure_endpoint,
+                                deployment=_azure_deployment, api_version=_azure_api_version, timing=_llm_latency,
+                            ):
+                                direct_answer += piece
+                                answer_box.success(direct_answer + " ▌")
+                        answer_box.success(direct_answer)
+                        answer_cache.put(
+                            query_vec, context, direct_answer, collection_name=active_collection, namespace=_azure_deployment,
+                        )
+                        if _llm_latency:
+                            st.caption(
+                                f"First token after {_llm_latency['ttft']:.2f}s, full answer after {_llm_latency['total']:.2f}s"
+                                + (f" ({_llm_latency['retries']} retries)." if _llm_latency["retries"] else ".")
+                            )
+                except Exception as e:
+                    answer_box.empty()
+                    st.error(f"Azure OpenAI error: {e}")
                 st.markdown("**Most relevant passage from your document:**")
                 st.info(out.get("key_passage", "") or "(none)")
                 with st.expander("Full context sent to GPT-4o"):
@@ -213,5 +439,41 @@ if query:
     except Exception as e:
         st.error(f"Retrieval failed. Upload a PDF, run all steps, and click **Store in ChromaDB** first. Error: {e}")
 
+# Stage latency panel (rendered last so it includes this run)
+if show_metrics:
+    with st.sidebar:
+        with st.expander("⏱️ Stage latency", expanded=False):
+            _stage_stats = metrics.get_stats()
+            if not _stage_stats:
+                st.caption("No stages recorded yet." if metrics.enabled() else "Recording is off (METRICS_ENABLED=0).")
+            else:
+                st.dataframe(
+                    [
+                        {
+                            "stage": name,
+                            "calls": s["calls"],
+                            "p50 ms": round(s["p50"] * 1000, 1),
+                            "p95 ms": round(s["p95"] * 1000, 1),
+                            "items": s["items"],
+                            "errors": s["errors"],
+                        }
+                        for name, s in _stage_stats.items()
+                    ],
+                    hide_index=True,
+                )
+                st.download_button("Export JSON", metrics.to_json(), file_name="rag_metrics.json", mime="application/json")
+                st.download_button("Export Prometheus", metrics.to_prometheus(), file_name="rag_metrics.prom", mime="text/plain")
+                if st.button("Reset metrics", key="metrics_reset"):
+                    metrics.reset()
+                    st.rerun()
+
+# After the first render: load the embedding model, open the vector store, check a loaded
+# snapshot against the model's weights and load the tokenizer in the background (once per
+# process) so the first Embed / question doesn't wait for imports
+warm_up_async(
+    WARMUP_MODELS,
+    also=(warm_up_storage, lambda: snapshot.verify_loaded(SNAPSHOT_PATH), lambda: count_tokens(""), namespaces.evict),
+)
+
 st.divider()
 st.caption("RAG Demo – components: data_collection, cleaning, chunking, embedding, storage, retrieval, generation.")
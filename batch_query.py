@@ -0,0 +1,67 @@
+"""
+Bulk retrieval: stream questions from a file and write one JSON line of results per question.
+Run from project root, e.g.:
+    python batch_query.py sample_questions_Think-And-Grow-Rich.md --method semantic --top-k 3 --out results.jsonl
+    python batch_query.py questions.txt --collection reports --method hybrid
+Plain text files are read one question per line; Markdown files use the '**Prompt:**' lines.
+"""
+import argparse
+import json
+import sys
+from itertools import islice
+
+from config import CHROMA_DIR, COLLECTION_NAME, TOP_K_RETRIEVAL
+from components.retrieval import retrieve_batch, RETRIEVER_METHODS
+
+PROMPT_PREFIX = "**Prompt:**"
+
+
+def read_questions(path: str):
+    """Yield questions from path without loading the whole file."""
+    markdown = path.lower().endswith(".md")
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if markdown:
+                if not line.startswith(PROMPT_PREFIX):
+                    continue
+                line = line[len(PROMPT_PREFIX):].strip()
+            if line:
+                yield line
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run retrieval for many questions and write JSONL results.")
+    parser.add_argument("questions", help="Question file (.txt: one per line, .md: '**Prompt:**' lines)")
+    parser.add_argument("--collection", default=COLLECTION_NAME, help="Collection to query (e.g. one written by ingest.py)")
+    parser.add_argument("--persist-dir", default=CHROMA_DIR)
+    parser.add_argument("--method", default="semantic", choices=list(RETRIEVER_METHODS.keys()))
+    parser.add_argument("--top-k", type=int, default=TOP_K_RETRIEVAL)
+    parser.add_argument("--batch-size", type=int, default=64, help="Questions encoded and queried together")
+    parser.add_argument("--out", help="Output JSONL file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    count = 0
+    try:
+        questions = read_questions(args.questions)
+        while True:
+            batch = list(islice(questions, args.batch_size))
+            if not batch:
+                break
+            results_batch = retrieve_batch(
+                batch, method=args.method, top_k=args.top_k, collection_name=args.collection, persist_dir=args.persist_dir,
+            )
+            for query, results in zip(batch, results_batch):
+                out.write(json.dumps({"query": query, "method": args.method, "results": results}, ensure_ascii=False) + "\n")
+                count += 1
+            out.flush()
+    finally:
+        if args.out:
+            out.close()
+    print(f"Wrote results for {count} questions.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Offline benchmarks (no network, no embedding model). Run from project root: python -m benchmarks.<name>
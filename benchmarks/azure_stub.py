@@ -0,0 +1,107 @@
+"""
+Local stand-in for the Azure OpenAI chat completions endpoint, for running the app or the
+llm_azure client without network or keys. Run from project root:
+    python -m benchmarks.azure_stub --port 8765 --fail-first 1
+then set AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8765 and AZURE_OPENAI_API_KEY=stub.
+Answers echo the question; --fail-first N answers the first N requests with 429.
+tests/test_llm_azure.py runs the client against it (start_stub).
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(fail_first: int = 0, token_delay: float = 0.0, response_delay: float = 0.0):
+    # requests: total received; in_flight / max_in_flight: concurrent requests being answered
+    state = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            with lock:
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            try:
+                self._answer()
+            finally:
+                with lock:
+                    state["in_flight"] -= 1
+
+        def _answer(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with lock:
+                state["requests"] += 1
+                n = state["requests"]
+            if n <= fail_first:
+                payload = json.dumps({"error": {"code": "429", "message": "Rate limit (stub)"}}).encode()
+                self.send_response(429)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            time.sleep(response_delay)
+            question = body["messages"][-1]["content"].rsplit("Question:", 1)[-1].strip()
+            words = f"Stub answer to: {question}".split(" ")
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for i, word in enumerate(words):
+                    chunk = {
+                        "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                        "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                return
+
+            payload = json.dumps({
+                "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler, state
+
+
+def start_stub(port: int = 0, fail_first: int = 0, token_delay: float = 0.0, response_delay: float = 0.0):
+    """Start the stub in a background thread. Returns (server, endpoint_url, state)."""
+    handler, state = make_handler(fail_first, token_delay, response_delay)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", state
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a local Azure OpenAI chat completions stub.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-first", type=int, default=0, help="Answer the first N requests with 429")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between streamed tokens")
+    args = parser.parse_args(argv)
+    server, url, _ = start_stub(args.port, args.fail_first, args.token_delay)
+    print(f"Azure OpenAI stub at {url} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
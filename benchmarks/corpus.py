@@ -0,0 +1,128 @@
+"""
+Synthetic corpus for the benchmarks: deterministic, topic-clustered text written as a real
+(uncompressed, Helvetica) PDF so the whole pipeline, pypdf extraction included, is exercised.
+Run from project root:
+    python -m benchmarks.corpus --pages 10 100 1000 5000 --out-dir bench_corpus
+"""
+import argparse
+import os
+import random
+import sys
+
+_SYLLABLES = "ka lo mi ra te su no vi da pe sho ren tal mor quin zel bra dor fen gal".split()
+LINES_PER_PAGE = 42
+WORDS_PER_LINE = 11
+
+
+def vocabulary(size: int = 3000, seed: int = 0) -> list[str]:
+    """Pronounceable made-up words; index order doubles as frequency rank (Zipf-like sampling)."""
+    rnd = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rnd.choice(_SYLLABLES) for _ in range(rnd.randint(2, 4))))
+    return sorted(words, key=lambda w: (len(w), w))
+
+
+class Corpus:
+    """
+    Pages drawn from `topics` word clusters: common words everywhere, each page mixing in the
+    rarer words of its topic, plus a running header/footer like real reports have.
+    """
+
+    def __init__(self, seed: int = 0, topics: int = 40):
+        self.seed = seed
+        self.vocab = vocabulary(seed=seed)
+        common, rare = self.vocab[:300], self.vocab[300:]
+        per_topic = len(rare) // topics
+        self.common = common
+        self.topics = [rare[t * per_topic:(t + 1) * per_topic] for t in range(topics)]
+        self._weights = [1.0 / (rank + 1) for rank in range(len(common))]
+
+    def _topic(self, page: int) -> list[str]:
+        # Runs of ~5 consecutive pages share a topic, like chapters
+        return self.topics[(page // 5) % len(self.topics)]
+
+    def page_lines(self, page: int) -> list[str]:
+        rnd = random.Random(self.seed * 1_000_003 + page)
+        topic = self._topic(page)
+        lines = [f"Synthetic Benchmark Report chapter {page // 5 + 1}"]
+        for _ in range(LINES_PER_PAGE - 2):
+            words = [
+                rnd.choice(topic) if rnd.random() < 0.3 else rnd.choices(self.common, self._weights)[0]
+                for _ in range(WORDS_PER_LINE)
+            ]
+            words[0] = words[0].capitalize()
+            lines.append(" ".join(words) + ("." if rnd.random() < 0.6 else ","))
+        lines.append(f"Page {page + 1}")
+        return lines
+
+    def page_text(self, page: int) -> str:
+        return "\n".join(self.page_lines(page))
+
+    def queries(self, n: int, pages: int, seed: int = 1) -> list[str]:
+        """Questions mixing a few topic words and common words from pages in range(pages)."""
+        rnd = random.Random(seed)
+        out = []
+        for _ in range(n):
+            topic = self._topic(rnd.randrange(pages))
+            words = rnd.sample(topic, 3) + rnd.sample(self.common[:100], 2)
+            rnd.shuffle(words)
+            out.append("What about " + " ".join(words) + "?")
+        return out
+
+
+def write_pdf(path: str, pages: int, corpus: Corpus = None) -> str:
+    """Write a `pages`-page PDF of corpus text to path (streamed; no PDF library needed)."""
+    corpus = corpus or Corpus()
+    font_obj = 3 + 2 * pages
+    offsets = []
+    with open(path, "wb") as f:
+        def obj(body: bytes) -> None:
+            offsets.append(f.tell())
+            f.write(f"{len(offsets)} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        obj(b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+        obj(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+        for i in range(pages):
+            shown = " ".join(f"({line}) Tj 0 -16 Td" for line in corpus.page_lines(i))
+            stream = f"BT /F1 10 Tf 50 760 Td {shown} ET".encode()
+            obj(
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+                f"/Resources << /Font << /F1 {font_obj} 0 R >> >> >>".encode()
+            )
+            obj(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+        obj(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        xref = f.tell()
+        f.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+        f.write("".join(f"{o:010d} 00000 n \n" for o in offsets).encode())
+        f.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return path
+
+
+def corpus_pdf(out_dir: str, pages: int, seed: int = 0) -> str:
+    """Path to the synthetic PDF with this many pages, generating it once per out_dir."""
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"synthetic_{pages}p_s{seed}.pdf")
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        write_pdf(tmp, pages, Corpus(seed))
+        os.replace(tmp, path)
+    return path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark PDFs.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-dir", default="bench_corpus")
+    args = parser.parse_args(argv)
+    for n in args.pages:
+        path = corpus_pdf(args.out_dir, n, args.seed)
+        print(f"{path}  ({os.path.getsize(path) / 1e6:.1f} MB)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+Tune ChromaDB's HNSW index on a stored collection: for every (space, M, construction_ef,
+search_ef) in the grid, build the index over the collection's vectors in a scratch directory
+and measure recall@k against exact brute-force search and p50/p95 query latency. Queries are
+held-out chunks (not indexed) unless --questions is given. Recommends the fastest setting that
+reaches --target-recall. Run from project root:
+    python -m benchmarks.hnsw_tuning --collection rag_demo --top-k 5 --out hnsw.json
+    python -m benchmarks.hnsw_tuning --m 8 16 32 --search-ef 16 32 64 128 --target-recall 0.98
+    python -m benchmarks.hnsw_tuning --collection reports --apply
+The stored collection is only read (either backend), unless --apply sets the recommended
+search_ef on it (ChromaDB; the other settings are fixed at creation, see config.py).
+"""
+import argparse
+import itertools
+import json
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from config import (
+    CHROMA_DIR,
+    COLLECTION_NAME,
+    EMBEDDING_MODEL,
+    VECTOR_STORE_BACKEND,
+    HNSW_SPACE,
+    HNSW_M,
+    HNSW_CONSTRUCTION_EF,
+    HNSW_SEARCH_EF,
+)
+from components.storage import (
+    get_collection,
+    get_or_create_collection,
+    delete_collection,
+    set_search_ef,
+    reset_client,
+)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def load_corpus(collection_name: str, persist_dir: str, backend: str) -> np.ndarray:
+    """All vectors of a stored collection as a float32 matrix."""
+    data = get_collection(collection_name, persist_dir, backend).get(include=["embeddings"])
+    if data["embeddings"] is None or not len(data["embeddings"]):
+        raise ValueError(f"Collection {collection_name} has no vectors")
+    return np.asarray(data["embeddings"], dtype=np.float32)
+
+
+def split_queries(vectors: np.ndarray, num_queries: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """(corpus, queries): num_queries random rows held out as queries (at most a fifth of the rows)."""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    n = min(num_queries, len(vectors) // 5)
+    return vectors[order[n:]], vectors[order[:n]]
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, top_k: int, space: str) -> list[set]:
+    """Brute-force nearest neighbours (row numbers) under the given distance."""
+    if space == "cosine":
+        c = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+        q = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        distances = -(q @ c.T)
+    elif space == "ip":
+        distances = -(queries @ corpus.T)
+    else:
+        distances = (queries ** 2).sum(1)[:, None] - 2 * queries @ corpus.T + (corpus ** 2).sum(1)[None, :]
+    return [set(np.argsort(row)[:top_k].tolist()) for row in distances]
+
+
+def _time_queries(search, queries: np.ndarray) -> tuple[list, list[float]]:
+    search(queries[0])  # warm-up (index load, caches)
+    found, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        found.append(search(q))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return found, latencies
+
+
+def bench_exact(corpus: np.ndarray, queries: np.ndarray, top_k: int) -> dict:
+    """Latency of exact search over the in-memory matrix (what the numpy backend does)."""
+    normed = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+    _, latencies = _time_queries(lambda q: np.argpartition(-(normed @ q), top_k)[:top_k], queries)
+    return {"query_ms_p50": round(statistics.median(latencies), 3), "query_ms_p95": round(_percentile(latencies, 95), 3)}
+
+
+def run(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    top_k: int,
+    spaces: list[str],
+    ms: list[int],
+    construction_efs: list[int],
+    search_efs: list[int],
+) -> list[dict]:
+    """One row per grid point: build seconds, p50/p95 query latency (ms) and recall@k."""
+    ids = [str(i) for i in range(len(corpus))]
+    rows = []
+    with tempfile.TemporaryDirectory() as persist_dir:
+        for space in spaces:
+            truth = exact_top_k(corpus, queries, top_k, space)
+            for m, construction_ef in itertools.product(ms, construction_efs):
+                name = f"tune_{space}_{m}_{construction_ef}"
+                hnsw = {"space": space, "M": m, "construction_ef": construction_ef, "search_ef": search_efs[0]}
+                col = get_or_create_collection(name, persist_dir, backend="chroma", hnsw=hnsw)
+                start = time.perf_counter()
+                for i in range(0, len(ids), 1000):
+                    col.add(ids=ids[i:i + 1000], embeddings=corpus[i:i + 1000])
+                build = time.perf_counter() - start
+                for search_ef in search_efs:
+                    set_search_ef(col, search_ef)
+                    # chromadb keeps a loaded index's search_ef: reopen so the new value is used
+                    reset_client(persist_dir)
+                    col = get_collection(name, persist_dir, "chroma")
+                    found, latencies = _time_queries(
+                        lambda q: col.query(query_embeddings=[q.tolist()], n_results=top_k, include=[])["ids"][0],
+                        queries,
+                    )
+                    recall = statistics.mean(
+                        len(truth[j] & {int(i) for i in found[j]}) / min(top_k, len(corpus)) for j in range(len(queries))
+                    )
+                    row = {
+                        "space": space, "M": m, "construction_ef": construction_ef, "search_ef": search_ef,
+                        "build_seconds": round(build, 3),
+                        "query_ms_p50": round(statistics.median(latencies), 3),
+                        "query_ms_p95": round(_percentile(latencies, 95), 3),
+                        "recall_at_k": round(recall, 4),
+                    }
+                    rows.append(row)
+                    print(f"{space:6s} M={m:3d} construction_ef={construction_ef:4d} search_ef={search_ef:4d}  "
+                          f"build {build:.2f}s  p50 {row['query_ms_p50']:.2f}ms  p95 {row['query_ms_p95']:.2f}ms  "
+                          f"recall@{top_k} {recall:.3f}", file=sys.stderr)
+                delete_collection(name, persist_dir, backend="chroma")
+    return rows
+
+
+def recommend(rows: list[dict], target_recall: float) -> dict:
+    """Lowest p95 among rows reaching target_recall (then cheaper builds); else the best recall."""
+    good = [r for r in rows if r["recall_at_k"] >= target_recall]
+    if good:
+        return min(good, key=lambda r: (r["query_ms_p95"], r["build_seconds"]))
+    return max(rows, key=lambda r: (r["recall_at_k"], -r["query_ms_p95"]))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure HNSW recall@k and latency on a stored collection.")
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--persist-dir", default=CHROMA_DIR)
+    parser.add_argument("--backend", default=VECTOR_STORE_BACKEND, choices=["chroma", "numpy"], help="Backend of the stored collection")
+    parser.add_argument("--questions", help="Text file, one question per line, embedded as queries (default: held-out chunks)")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--queries", type=int, default=200, help="Held-out chunks used as queries")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--space", nargs="+", default=[HNSW_SPACE], choices=["cosine", "l2", "ip"])
+    parser.add_argument("--m", type=int, nargs="+", default=sorted({8, 16, 32, HNSW_M}))
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=sorted({64, 128, 256, HNSW_CONSTRUCTION_EF}))
+    parser.add_argument("--search-ef", type=int, nargs="+", default=sorted({10, 32, 64, 128, HNSW_SEARCH_EF}))
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--out", help="Write results as JSON here (default: stdout)")
+    parser.add_argument("--apply", action="store_true", help="Set the recommended search_ef on the stored ChromaDB collection")
+    args = parser.parse_args(argv)
+
+    vectors = load_corpus(args.collection, args.persist_dir, args.backend)
+    if args.questions:
+        from components.embedding import encode_texts
+
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+        corpus, queries = vectors, np.asarray(encode_texts(questions, args.model), dtype=np.float32)
+    else:
+        corpus, queries = split_queries(vectors, args.queries)
+    if not len(queries):
+        print(f"Not enough vectors in {args.collection} to hold out queries; pass --questions.", file=sys.stderr)
+        return 2
+    print(f"{len(corpus)} vectors, {len(queries)} queries, top_k={args.top_k}", file=sys.stderr)
+
+    rows = run(corpus, queries, args.top_k, args.space, args.m, args.construction_ef, args.search_ef)
+    best = recommend(rows, args.target_recall)
+    report = {
+        "collection": args.collection,
+        "vectors": len(corpus),
+        "queries": len(queries),
+        "top_k": args.top_k,
+        "target_recall": args.target_recall,
+        "exact": bench_exact(corpus, queries, args.top_k),
+        "grid": rows,
+        "recommended": best,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    reached = best["recall_at_k"] >= args.target_recall
+    print(("Recommended" if reached else f"No setting reached recall {args.target_recall}; best"), file=sys.stderr)
+    print(f"  HNSW_SPACE = \"{best['space']}\"\n  HNSW_M = {best['M']}\n  HNSW_CONSTRUCTION_EF = {best['construction_ef']}\n"
+          f"  HNSW_SEARCH_EF = {best['search_ef']}\n"
+          f"  (recall@{args.top_k} {best['recall_at_k']:.3f}, p95 {best['query_ms_p95']:.2f}ms; "
+          f"exact search p95 {report['exact']['query_ms_p95']:.2f}ms)", file=sys.stderr)
+
+    if args.apply:
+        if args.backend != "chroma":
+            print("--apply: the numpy backend has no HNSW index; nothing to set.", file=sys.stderr)
+        elif not reached:
+            print("--apply: target recall not reached; search_ef left unchanged.", file=sys.stderr)
+        else:
+            set_search_ef(get_collection(args.collection, args.persist_dir, "chroma"), best["search_ef"])
+            print(f"Set search_ef={best['search_ef']} on {args.collection}; ChromaDB uses it from the next index "
+                  "load (e.g. after an app restart).", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
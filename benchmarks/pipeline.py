@@ -0,0 +1,226 @@
+"""
+End-to-end pipeline benchmark on synthetic PDFs (benchmarks/corpus.py): per-stage throughput,
+peak RSS of streaming ingestion, and p50/p99 retrieval latency for every RETRIEVER_METHODS
+entry at several top_k. No network: the embedding model must already be in the local
+Hugging Face cache. Run from project root:
+    python -m benchmarks.pipeline --pages 10 100 1000 --out results.json
+    python -m benchmarks.pipeline --pages 10 100 1000 --compare results.json
+The vector store backend follows VECTOR_STORE_BACKEND; the embedding cache is bypassed.
+"""
+import os
+
+# Before anything imports sentence_transformers / config (also inherited by worker processes)
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+os.environ["EMBEDDING_CACHE_ENABLED"] = "0"
+
+import argparse
+import json
+import multiprocessing
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from config import EMBEDDING_MODEL, VECTOR_STORE_BACKEND
+from benchmarks.corpus import Corpus, corpus_pdf
+from components import metrics
+from components.model_registry import get_model
+
+PIPELINE_STAGES = ["load_pdf", "clean", "chunk", "embed", "store"]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _peak_rss_mb():
+    """Peak resident memory of this process so far (MB), or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _ingest_worker(pdf_path: str, persist_dir: str, model_name: str) -> dict:
+    """Runs in a fresh process so ru_maxrss is this ingestion's peak alone."""
+    from components.ingestion import ingest_pdf
+
+    get_model(model_name)
+    baseline = _peak_rss_mb()
+    result = ingest_pdf(pdf_path, model_name=model_name, collection_name="bench_ingest", persist_dir=persist_dir)
+    return {
+        "pages": result["pages"],
+        "chunks": result["chunks"],
+        "seconds": result["total_seconds"],
+        "pages_per_second": round(result["pages"] / result["total_seconds"], 1) if result["total_seconds"] else None,
+        "stages": result["stages"],
+        "rss_mb_after_model_load": baseline,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def bench_ingestion(pdf_path: str, persist_dir: str, model_name: str) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(_ingest_worker, (pdf_path, persist_dir, model_name))
+
+
+def bench_stages(pdf_path: str, persist_dir: str, model_name: str) -> dict:
+    """The app's in-memory path, stage by stage; throughput from components.metrics."""
+    from components.data_collection import load_pdf
+    from components.cleaning import clean_pages
+    from components.chunking import chunk_table
+    from components.embedding import encode_texts
+    from components.storage import sync_embeddings
+
+    metrics.reset()
+    collected = load_pdf(pdf_path)
+    cleaned = clean_pages(collected["pages"])
+    chunks = chunk_table(cleaned["text"], page_starts=cleaned["page_starts"])
+    vectors = encode_texts([c["text"] for c in chunks], model_name, use_cache=False)
+    embeddings = [{**c, "embedding": v} for c, v in zip(chunks, vectors)]
+    sync_embeddings(embeddings, collection_name="bench", persist_dir=persist_dir, source=os.path.basename(pdf_path))
+    stats = metrics.get_stats()
+    return {
+        "chunks": len(chunks),
+        "stages": {
+            stage: {"items": stats[stage]["items"], "seconds": stats[stage]["seconds"], "per_second": stats[stage]["per_second"]}
+            for stage in PIPELINE_STAGES
+            if stage in stats
+        },
+    }
+
+
+def bench_retrieval(queries: list[str], top_ks: list[int], persist_dir: str, model_name: str) -> list[dict]:
+    from components.retrieval import RETRIEVER_METHODS, retrieve_with_method
+
+    rows = []
+    for method in RETRIEVER_METHODS:
+        for top_k in top_ks:
+            kwargs = {"collection_name": "bench", "persist_dir": persist_dir}
+            if method in ("semantic", "hybrid"):
+                kwargs["model_name"] = model_name
+            retrieve_with_method(queries[0], method=method, top_k=top_k, **kwargs)  # warm-up
+            latencies = []
+            for q in queries:
+                start = time.perf_counter()
+                retrieve_with_method(q, method=method, top_k=top_k, **kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+            rows.append({
+                "method": method,
+                "top_k": top_k,
+                "queries": len(queries),
+                "p50_ms": round(statistics.median(latencies), 3),
+                "p99_ms": round(_percentile(latencies, 99), 3),
+                "mean_ms": round(statistics.mean(latencies), 3),
+            })
+    return rows
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(sizes: list[int], top_ks: list[int], num_queries: int, corpus_dir: str, model_name: str) -> dict:
+    get_model(model_name)
+    metrics.set_enabled(True)
+    corpus = Corpus()
+    runs = []
+    for pages in sizes:
+        pdf_path = corpus_pdf(corpus_dir, pages)
+        with tempfile.TemporaryDirectory() as persist_dir:
+            stages = bench_stages(pdf_path, persist_dir, model_name)
+            retrieval = bench_retrieval(corpus.queries(num_queries, pages), top_ks, persist_dir, model_name)
+            ingestion = bench_ingestion(pdf_path, persist_dir, model_name)
+        runs.append({"pages": pages, **stages, "ingestion": ingestion, "retrieval": retrieval})
+        print(
+            f"pages={pages:5d} chunks={stages['chunks']:6d}  "
+            + "  ".join(f"{s} {v['per_second']}/s" for s, v in stages["stages"].items())
+            + f"  ingest {ingestion['seconds']}s peak {ingestion['peak_rss_mb']} MB",
+            file=sys.stderr,
+        )
+        for r in retrieval:
+            print(f"    {r['method']:8s} top_k={r['top_k']:3d}  p50 {r['p50_ms']:.2f}ms  p99 {r['p99_ms']:.2f}ms", file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "model": model_name,
+            "backend": VECTOR_STORE_BACKEND,
+        },
+        "runs": runs,
+    }
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    """One line per stage / retriever that both results cover: old -> new and the ratio."""
+    lines = []
+    old_runs = {r["pages"]: r for r in old.get("runs", [])}
+    for run_new in new.get("runs", []):
+        run_old = old_runs.get(run_new["pages"])
+        if run_old is None:
+            continue
+        for stage, s in run_new["stages"].items():
+            before = run_old["stages"].get(stage, {}).get("per_second")
+            if before and s["per_second"]:
+                lines.append(f"pages={run_new['pages']} {stage}: {before} -> {s['per_second']} items/s ({s['per_second'] / before:.2f}x)")
+        before, after = run_old["ingestion"].get("peak_rss_mb"), run_new["ingestion"].get("peak_rss_mb")
+        if before and after:
+            lines.append(f"pages={run_new['pages']} ingest peak RSS: {before} -> {after} MB ({after / before:.2f}x)")
+        old_ret = {(r["method"], r["top_k"]): r for r in run_old["retrieval"]}
+        for r in run_new["retrieval"]:
+            o = old_ret.get((r["method"], r["top_k"]))
+            if o and o["p50_ms"]:
+                lines.append(
+                    f"pages={run_new['pages']} {r['method']} top_k={r['top_k']}: p50 {o['p50_ms']} -> {r['p50_ms']} ms "
+                    f"({r['p50_ms'] / o['p50_ms']:.2f}x), p99 {o['p99_ms']} -> {r['p99_ms']} ms"
+                )
+    return lines
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ingestion throughput and retrieval latency on synthetic PDFs.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000], help="Corpus sizes (up to 5000 pages)")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "rag_bench_corpus"),
+                        help="Where generated PDFs are kept between runs")
+    parser.add_argument("--out", help="Write results as JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    results = run(args.pages, args.top_k, args.queries, args.corpus_dir, args.model)
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} ({baseline.get('meta', {}).get('git_commit')}):", file=sys.stderr)
+        for line in compare(baseline, results):
+            print("  " + line, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
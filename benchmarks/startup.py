@@ -0,0 +1,74 @@
+"""
+Cold-start guard: import everything app.py imports from config/components in a fresh
+interpreter, time it, and check that no heavy dependency (torch, chromadb, pypdf, ...) was
+pulled in before first use. Exits 1 if the budget is exceeded, so it can gate CI.
+Run from project root:
+    python -m benchmarks.startup --max-seconds 1.5 --repeat 3
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Must only be imported on first use, never at startup
+HEAVY_MODULES = ["sentence_transformers", "torch", "transformers", "chromadb", "pypdf", "openai", "tiktoken"]
+# Seconds allowed for importing app.py's modules (--max-seconds default; tests/test_startup.py)
+MAX_SECONDS = 1.5
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def app_imports(app_path: str = os.path.join(ROOT, "app.py")) -> list[str]:
+    """Project modules imported by app.py (config and components.*), in order."""
+    with open(app_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.split(".")[0] in ("config", "components"):
+            names = [node.module] if node.module != "components" else [f"components.{a.name}" for a in node.names]
+            modules.extend(n for n in names if n not in modules)
+    return modules
+
+
+def measure(modules: list[str]) -> dict:
+    code = _PROBE.format(modules=modules, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check app import time and that heavy dependencies load lazily.")
+    parser.add_argument("--max-seconds", type=float, default=MAX_SECONDS, help="Budget for importing app.py's modules")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters to run; the fastest counts")
+    args = parser.parse_args(argv)
+
+    modules = app_imports()
+    runs = [measure(modules) for _ in range(max(1, args.repeat))]
+    best = min(r["seconds"] for r in runs)
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    print(json.dumps({"modules": modules, "seconds": round(best, 3), "heavy_loaded": loaded}, indent=2))
+
+    ok = True
+    if best > args.max_seconds:
+        print(f"FAIL: imports took {best:.3f}s (budget {args.max_seconds}s)", file=sys.stderr)
+        ok = False
+    if loaded:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(loaded)}", file=sys.stderr)
+        ok = False
+    if ok:
+        print(f"OK: {best:.3f}s, no heavy modules at startup", file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Compare vector store backends (chroma vs numpy) on synthetic embeddings.
+Run from project root:
+    python -m benchmarks.vector_stores --sizes 1000 5000 --queries 200 --top-k 5 --out vector_stores.json
+Reports build time, p50/p95 query latency and recall@k against exact search.
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from components.storage import get_or_create_collection, delete_collection
+
+BACKENDS = ["chroma", "numpy"]
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors (like topic-grouped chunks) so nearest neighbours are meaningful."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 50), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def bench_backend(backend: str, vectors: np.ndarray, queries: np.ndarray, top_k: int, persist_dir: str) -> dict:
+    name = f"bench_{backend}"
+    delete_collection(name, persist_dir, backend=backend)
+    col = get_or_create_collection(name, persist_dir, backend=backend)
+    ids = [f"v{i}" for i in range(len(vectors))]
+
+    start = time.perf_counter()
+    for i in range(0, len(ids), 1000):
+        col.add(ids=ids[i:i + 1000], embeddings=vectors[i:i + 1000], documents=ids[i:i + 1000])
+    build = time.perf_counter() - start
+
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        res = col.query(query_embeddings=[q.tolist()], n_results=top_k, include=["distances"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(res["ids"][0])
+    delete_collection(name, persist_dir, backend=backend)
+    return {
+        "build_seconds": round(build, 3),
+        "query_ms_p50": round(statistics.median(latencies), 3),
+        "query_ms_p95": round(_percentile(latencies, 95), 3),
+        "results": results,
+    }
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, top_k: int) -> list[set]:
+    sims = vectors @ queries.T
+    return [set(f"v{i}" for i in np.argsort(-sims[:, j])[:top_k]) for j in range(len(queries))]
+
+
+def run(sizes: list[int], dim: int, num_queries: int, top_k: int) -> list[dict]:
+    rows = []
+    with tempfile.TemporaryDirectory() as persist_dir:
+        for n in sizes:
+            vectors = synthetic_vectors(n, dim)
+            queries = synthetic_vectors(num_queries, dim, seed=1)
+            truth = exact_top_k(vectors, queries, top_k)
+            for backend in BACKENDS:
+                res = bench_backend(backend, vectors, queries, top_k, persist_dir)
+                found = res.pop("results")
+                recall = statistics.mean(len(truth[j] & set(found[j])) / top_k for j in range(num_queries))
+                rows.append({"backend": backend, "n": n, "dim": dim, "top_k": top_k, **res, "recall_at_k": round(recall, 4)})
+                print(f"{backend:7s} n={n:6d}  build {res['build_seconds']:.2f}s  "
+                      f"p50 {res['query_ms_p50']:.2f}ms  p95 {res['query_ms_p95']:.2f}ms  recall@{top_k} {recall:.3f}",
+                      file=sys.stderr)
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark vector store backends on synthetic vectors.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--dim", type=int, default=384, help="Embedding size (all-MiniLM-L6-v2: 384)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--out", help="Write results as JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    rows = run(args.sizes, args.dim, args.queries, args.top_k)
+    text = json.dumps(rows, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Answer cache - reuse LLM answers for the same context and a near-duplicate question."""
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from config import (
+    COLLECTION_NAME,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_MAX_ENTRIES,
+)
+
+_lock = threading.Lock()
+# entry id -> {"collection", "context_key", "query_vec", "answer", "created"}; least recently used first
+_entries: "OrderedDict[int, dict]" = OrderedDict()
+_next_id = 0
+_stats = {"hits": 0, "misses": 0, "invalidated": 0}
+
+
+def _context_key(context: str, namespace: str) -> str:
+    return hashlib.sha256(f"{namespace}\x00{context}".encode("utf-8")).hexdigest()
+
+
+def _unit(vec) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32).ravel()
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+def lookup(
+    query_embedding,
+    context: str,
+    collection_name: str = COLLECTION_NAME,
+    namespace: str = "",
+    threshold: float = ANSWER_CACHE_SIMILARITY,
+    ttl: float = ANSWER_CACHE_TTL,
+) -> Optional[dict]:
+    """
+    Cached answer for a question whose embedding is at least `threshold` cosine-similar to
+    one asked before with exactly the same retrieved context (and namespace, e.g. the LLM
+    deployment). Returns {'answer', 'similarity', 'age'} or None.
+    """
+    key = _context_key(context, namespace)
+    q = _unit(query_embedding)
+    now = time.time()
+    with _lock:
+        best_id, best_sim = None, threshold
+        for entry_id, entry in list(_entries.items()):
+            if now - entry["created"] > ttl:
+                del _entries[entry_id]
+                continue
+            if entry["context_key"] != key or entry["collection"] != collection_name:
+                continue
+            sim = float(np.dot(entry["query_vec"], q))
+            if sim >= best_sim:
+                best_id, best_sim = entry_id, sim
+        if best_id is None:
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(best_id)
+        _stats["hits"] += 1
+        entry = _entries[best_id]
+        return {"answer": entry["answer"], "similarity": round(best_sim, 4), "age": round(now - entry["created"], 1)}
+
+
+def put(
+    query_embedding,
+    context: str,
+    answer: str,
+    collection_name: str = COLLECTION_NAME,
+    namespace: str = "",
+    max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+) -> None:
+    """Remember an answer; drops the least recently used entries above max_entries."""
+    global _next_id
+    with _lock:
+        _entries[_next_id] = {
+            "collection": collection_name,
+            "context_key": _context_key(context, namespace),
+            "query_vec": _unit(query_embedding),
+            "answer": answer,
+            "created": time.time(),
+        }
+        _next_id += 1
+        while len(_entries) > max_entries:
+            _entries.popitem(last=False)
+
+
+def invalidate(collection_name: Optional[str] = None) -> None:
+    """Forget answers for a collection (all collections if None), e.g. after its chunks change."""
+    with _lock:
+        for entry_id in [i for i, e in _entries.items() if collection_name is None or e["collection"] == collection_name]:
+            del _entries[entry_id]
+            _stats["invalidated"] += 1
+
+
+def get_stats() -> dict:
+    with _lock:
+        return {**_stats, "entries": len(_entries)}
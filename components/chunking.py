@@ -1,7 +1,10 @@
 """Step 3: Chunking - split cleaned text for retrieval (multiple methods)."""
 from __future__ import annotations
 import re
+from array import array
+from bisect import bisect_right
 from config import CHUNK_SIZE, CHUNK_OVERLAP
+from components.metrics import traced
 
 
 def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[dict]:
@@ -49,18 +52,23 @@ def chunk_by_sentences(
     index = 0
     i = 0
     while i < len(sentences):
+        start = i
         current = []
         current_len = 0
         while i < len(sentences) and current_len + len(sentences[i]) + 1 <= max_chars:
             current.append(sentences[i])
             current_len += len(sentences[i]) + 1
             i += 1
-        if current:
-            chunk_text_str = " ".join(current)
-            chunks.append({"index": index, "text": chunk_text_str})
-            index += 1
-        if overlap_sentences > 0 and current:
-            i = max(0, i - overlap_sentences)
+        if not current:
+            # Sentence longer than max_chars: keep it whole rather than stall
+            current.append(sentences[i])
+            i += 1
+        chunk_text_str = " ".join(current)
+        chunks.append({"index": index, "text": chunk_text_str})
+        index += 1
+        # Step back for overlap, but always move forward and stop after the last sentence
+        if overlap_sentences > 0 and i < len(sentences):
+            i = max(start + 1, i - overlap_sentences)
     return chunks
 
 
@@ -126,3 +134,175 @@ def chunk_text_with_method(
     if method == "paragraph":
         return chunk_by_paragraphs(text, max_chars=chunk_size)
     return chunk_text(text, chunk_size=chunk_size, overlap=overlap)
+
+
+# --- Compact representation: offsets into the shared cleaned text + page number ---
+
+def strip_span(text: str, start: int, end: int) -> tuple[int, int]:
+    """Shrink [start, end) to exclude surrounding whitespace (like str.strip on the slice)."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def fixed_spans(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP, base: int = 0, end: int | None = None) -> list[tuple[int, int]]:
+    """(start, end) offsets of chunk_text's windows over text[base:end], whitespace-stripped."""
+    end = len(text) if end is None else end
+    spans = []
+    start = base
+    while start < end:
+        s, e = strip_span(text, start, min(start + chunk_size, end))
+        if s < e:
+            spans.append((s, e))
+        start = start + chunk_size - overlap
+    return spans
+
+
+def sentence_spans(text: str, max_chars: int = 500, overlap_sentences: int = 0) -> list[tuple[int, int]]:
+    """Offsets version of chunk_by_sentences: each span runs from its first to its last sentence."""
+    sentences = []
+    pos = 0
+    for m in re.finditer(r"(?<=[.!?])\s+", text):
+        s, e = strip_span(text, pos, m.start())
+        if s < e:
+            sentences.append((s, e))
+        pos = m.end()
+    s, e = strip_span(text, pos, len(text))
+    if s < e:
+        sentences.append((s, e))
+    if not sentences:
+        return fixed_spans(text, max_chars, 0)
+    spans = []
+    i = 0
+    while i < len(sentences):
+        first = i
+        current_len = 0
+        while i < len(sentences) and current_len + (sentences[i][1] - sentences[i][0]) + 1 <= max_chars:
+            current_len += sentences[i][1] - sentences[i][0] + 1
+            i += 1
+        if i == first:
+            # Sentence longer than max_chars: keep it whole rather than stall
+            i += 1
+        spans.append((sentences[first][0], sentences[i - 1][1]))
+        if overlap_sentences > 0 and i < len(sentences):
+            i = max(first + 1, i - overlap_sentences)
+    return spans
+
+
+def paragraph_spans(text: str, max_chars: int = 500) -> list[tuple[int, int]]:
+    """Offsets version of chunk_by_paragraphs: merged paragraphs, long ones split fixed-size."""
+    paras = []
+    pos = 0
+    for m in re.finditer(r"\n\n", text):
+        s, e = strip_span(text, pos, m.start())
+        if s < e:
+            paras.append((s, e))
+        pos = m.end()
+    s, e = strip_span(text, pos, len(text))
+    if s < e:
+        paras.append((s, e))
+    if not paras:
+        return fixed_spans(text, max_chars, 0)
+    spans = []
+    current = None
+    current_len = 0
+    for s, e in paras:
+        length = e - s
+        if current is not None and current_len + length + 2 <= max_chars:
+            current = (current[0], e)
+            current_len += length + 2
+            continue
+        if current is not None:
+            spans.append(current)
+        if length > max_chars:
+            spans.extend(fixed_spans(text, max_chars, 0, base=s, end=e))
+            current, current_len = None, 0
+        else:
+            current, current_len = (s, e), length
+    if current is not None:
+        spans.append(current)
+    return spans
+
+
+def chunk_spans(text: str, method: str = "fixed", chunk_size: int = 500, overlap: int = 50) -> list[tuple[int, int]]:
+    """(start, end) offsets for the selected chunking method (same options as chunk_text_with_method)."""
+    if not text or not text.strip():
+        return []
+    if method == "sentence":
+        return sentence_spans(text, max_chars=chunk_size, overlap_sentences=min(1, overlap // 50))
+    if method == "paragraph":
+        return paragraph_spans(text, max_chars=chunk_size)
+    return fixed_spans(text, chunk_size, overlap)
+
+
+class ChunkTable:
+    """
+    Chunks stored as start/end offsets into one shared cleaned text plus the page each chunk
+    starts on (0 = unknown), in compact arrays. Indexing/iterating gives the usual
+    {'index', 'text', 'page', 'start', 'end'} dicts, slicing the text only when asked for.
+    select() gives a subset sharing the text; its rows keep their original 'index'.
+    """
+
+    __slots__ = ("text", "starts", "ends", "pages", "numbers")
+
+    def __init__(self, text: str, spans: list[tuple[int, int]], page_starts: list[tuple[int, int]] | None = None):
+        self.text = text
+        self.starts = array("q", (s for s, _ in spans))
+        self.ends = array("q", (e for _, e in spans))
+        self.pages = array("i", [0] * len(spans))
+        if page_starts:
+            offsets = [off for off, _ in page_starts]
+            for i, start in enumerate(self.starts):
+                pos = bisect_right(offsets, start) - 1
+                self.pages[i] = page_starts[pos][1] if pos >= 0 else 0
+        self.numbers = None  # original chunk indices of a select()ed table
+
+    def select(self, rows) -> "ChunkTable":
+        """Table of the given rows (positions in this table), sharing the same text."""
+        table = ChunkTable.__new__(ChunkTable)
+        table.text = self.text
+        table.starts = array("q", (self.starts[i] for i in rows))
+        table.ends = array("q", (self.ends[i] for i in rows))
+        table.pages = array("i", (self.pages[i] for i in rows))
+        table.numbers = array("q", (self.numbers[i] if self.numbers is not None else i for i in rows))
+        return table
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _row(self, i: int) -> dict:
+        index = self.numbers[i] if self.numbers is not None else i
+        row = {"index": index, "text": self.text[self.starts[i]:self.ends[i]], "start": self.starts[i], "end": self.ends[i]}
+        if self.pages[i]:
+            row["page"] = self.pages[i]
+        return row
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._row(i) for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("chunk index out of range")
+        return self._row(key)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._row(i)
+
+
+@traced("chunk", count=len)
+def chunk_table(
+    text: str,
+    method: str = "fixed",
+    chunk_size: int = 500,
+    overlap: int = 50,
+    page_starts: list[tuple[int, int]] | None = None,
+) -> ChunkTable:
+    """
+    Compact alternative to chunk_text_with_method. page_starts is [(offset, page_number), ...]
+    into text, as returned by cleaning.clean_pages.
+    """
+    return ChunkTable(text, chunk_spans(text, method, chunk_size, overlap), page_starts)
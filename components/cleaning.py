@@ -1,7 +1,27 @@
 """Step 2: Data cleaning - normalize and clean raw text."""
 import re
 
+from components.metrics import traced
 
+
+def clean_page_text(raw: str) -> str:
+    """
+    Normalize whitespace, remove excess newlines, trim. Not traced: clean_text and
+    clean_pages record one span per call, and streaming ingestion times its own clean stage.
+    """
+    if not raw or not raw.strip():
+        return ""
+    # Collapse multiple newlines to at most 2
+    text = re.sub(r"\n{3,}", "\n\n", raw)
+    # Collapse multiple spaces to single
+    text = re.sub(r"[ \t]+", " ", text)
+    # Strip per line and then overall
+    lines = [line.strip() for line in text.split("\n")]
+    text = "\n".join(line for line in lines if line)
+    return text.strip()
+
+
+@traced("clean_text")
 def clean_text(raw: str) -> dict:
     """
     Clean raw text: normalize whitespace, remove excess newlines, trim.
@@ -11,19 +31,44 @@ def clean_text(raw: str) -> dict:
         return {"text": "", "stats": {"original_len": 0, "cleaned_len": 0}}
 
     original_len = len(raw)
-    text = raw
+    text = clean_page_text(raw)
+    return {
+        "text": text,
+        "stats": {
+            "original_len": original_len,
+            "cleaned_len": len(text),
+            "removed_chars": original_len - len(text),
+        },
+    }
 
-    # Collapse multiple newlines to at most 2
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    # Collapse multiple spaces to single
-    text = re.sub(r"[ \t]+", " ", text)
-    # Strip per line and then overall
-    lines = [line.strip() for line in text.split("\n")]
-    text = "\n".join(line for line in lines if line)
-    text = text.strip()
 
+@traced("clean", count=lambda r: len(r["page_starts"]))
+def clean_pages(pages: list[dict]) -> dict:
+    """
+    Clean each page of load_pdf's 'pages' and join them. The text equals
+    clean_text(load_pdf(...)['text'])['text']; 'page_starts' adds [(offset, page_number), ...]
+    marking where each page begins in it, so chunks can be traced back to pages.
+    """
+    parts = []
+    page_starts = []
+    offset = 0
+    original_len = 0
+    for p in pages:
+        original_len += len(p["text"])
+        cleaned = clean_page_text(p["text"])
+        if not cleaned:
+            continue
+        if parts:
+            offset += 1  # "\n" between pages
+        page_starts.append((offset, p["page"]))
+        parts.append(cleaned)
+        offset += len(cleaned)
+    text = "\n".join(parts)
+    # Pages were joined with "\n\n" in the raw text
+    original_len += 2 * max(len(pages) - 1, 0)
     return {
         "text": text,
+        "page_starts": page_starts,
         "stats": {
             "original_len": original_len,
             "cleaned_len": len(text),
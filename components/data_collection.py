@@ -1,24 +1,75 @@
 """Step 1: Data collection - load raw text from a single PDF."""
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from pypdf import PdfReader
+from typing import Iterator
 
+from config import PDF_WORKERS, PDF_PAGES_PER_TASK
+from components.metrics import traced
 
-def load_pdf(path: str) -> dict:
-    """
-    Load a single PDF and extract text from all pages.
-    Returns dict with 'text' (full raw text) and 'metadata' (page count, path).
-    """
+
+def _check_pdf_path(path) -> Path:
     path = Path(path)
     if not path.exists():
         raise FileNotFoundError(f"PDF not found: {path}")
     if path.suffix.lower() != ".pdf":
         raise ValueError("File must be a PDF")
+    return path
+
+
+def _extract_range(path: str, start: int, end: int) -> list[str]:
+    """Worker: extract text for pages [start, end) from its own reader."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def iter_pages(
+    path: str,
+    workers: int = PDF_WORKERS,
+    pages_per_task: int = PDF_PAGES_PER_TASK,
+) -> Iterator[dict]:
+    """
+    Yield {'page', 'text'} one page at a time, in page order. With workers > 1, page ranges
+    are extracted in a process pool; only a few ranges are in flight at once, so memory
+    stays bounded for very large PDFs.
+    """
+    from pypdf import PdfReader
 
+    path = _check_pdf_path(path)
     reader = PdfReader(str(path))
-    pages = []
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text() or ""
-        pages.append({"page": i + 1, "text": text})
+    num_pages = len(reader.pages)
+
+    if workers <= 1 or num_pages <= pages_per_task:
+        for i, page in enumerate(reader.pages):
+            yield {"page": i + 1, "text": page.extract_text() or ""}
+        return
+
+    ranges = [(s, min(s + pages_per_task, num_pages)) for s in range(0, num_pages, pages_per_task)]
+    # spawn: forking the Streamlit process (torch threads running) can deadlock, as in ingest.py
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        next_range = 0
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < workers * 2:
+                start, end = ranges[next_range]
+                pending.append((start, pool.submit(_extract_range, str(path), start, end)))
+                next_range += 1
+            start, future = pending.popleft()
+            for offset, text in enumerate(future.result()):
+                yield {"page": start + offset + 1, "text": text}
+
+
+@traced("load_pdf", count=lambda r: r["metadata"]["num_pages"])
+def load_pdf(path: str, workers: int = PDF_WORKERS) -> dict:
+    """
+    Load a single PDF and extract text from all pages.
+    Returns dict with 'text' (full raw text) and 'metadata' (page count, path).
+    """
+    path = _check_pdf_path(path)
+    pages = list(iter_pages(str(path), workers=workers))
 
     full_text = "\n\n".join(p["text"] for p in pages)
     return {
@@ -0,0 +1,103 @@
+"""Near-duplicate chunk detection (MinHash + LSH) - drop repeated headers, footers, TOCs before embedding."""
+from __future__ import annotations
+import re
+import zlib
+from array import array
+from typing import Iterable, Optional
+
+import numpy as np
+
+from config import DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_SHINGLE
+
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+def _shingles(text: str, k: int) -> set[str]:
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def _bands_for(threshold: float, num_perm: int) -> tuple[int, int]:
+    """
+    (bands, rows) whose LSH S-curve midpoint (1/b)^(1/r) is the highest one not above
+    threshold: candidates are verified afterwards, so err on the side of recall.
+    """
+    best, best_mid = (num_perm, 1), -1.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        mid = (1.0 / bands) ** (1.0 / rows)
+        if best_mid < mid <= threshold:
+            best, best_mid = (bands, rows), mid
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    Incremental MinHash/LSH index. check() returns the index of an earlier kept chunk whose
+    estimated Jaccard similarity (word shingles) is >= threshold, or registers the chunk as
+    kept and returns None. Works on a stream, so it's usable from streaming ingestion.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM, shingle: int = DEDUP_SHINGLE):
+        self.threshold = threshold
+        self.shingle = shingle
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+        self.bands, self.rows = _bands_for(threshold, num_perm)
+        self._buckets: list[dict] = [{} for _ in range(self.bands)]
+        self._signatures: dict[int, np.ndarray] = {}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        shingles = _shingles(text, self.shingle)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        hashes %= _PRIME
+        # (a * x + b) mod p for every permutation x shingle; min over shingles
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def check(self, index: int, text: str) -> Optional[int]:
+        sig = self.signature(text)
+        if sig is None:
+            return None
+        keys = [sig[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+        candidates = []
+        for band, key in enumerate(keys):
+            candidates.extend(self._buckets[band].get(key, ()))
+        for other in dict.fromkeys(candidates):
+            if float(np.mean(self._signatures[other] == sig)) >= self.threshold:
+                return other
+        self._signatures[index] = sig.astype(np.uint32)  # values < 2^31: half the memory per kept chunk
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(index)
+        return None
+
+
+def dedup_chunks(chunks: Iterable[dict], threshold: float = DEDUP_THRESHOLD) -> dict:
+    """
+    Find chunks that near-duplicate an earlier chunk. Returns {'kept': positions of the kept
+    chunks in the input, 'duplicates': {dropped index: kept index}, 'total', 'dropped',
+    'ratio'}; ChunkTable.select(result['kept']) gives the chunks to embed.
+    """
+    index = NearDuplicateIndex(threshold)
+    kept, duplicates = array("q"), {}
+    total = 0
+    for position, c in enumerate(chunks):
+        total += 1
+        original = index.check(c["index"], c["text"])
+        if original is None:
+            kept.append(position)
+        else:
+            duplicates[c["index"]] = original
+    return {
+        "kept": kept,
+        "duplicates": duplicates,
+        "total": total,
+        "dropped": len(duplicates),
+        "ratio": round(len(duplicates) / total, 4) if total else 0.0,
+    }
@@ -1,24 +1,94 @@
 """Step 4: Embedding - convert text chunks into vector embeddings."""
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+from config import EMBEDDING_CACHE_ENABLED, EMBED_TOKEN_BUDGET, EMBED_MAX_BATCH
+from components.model_registry import get_model
+from components import embedding_cache
+from components.metrics import traced
 
 
 def get_embedding_model(model_name: str = "all-MiniLM-L6-v2"):
-    """Load the sentence-transformers model (cached after first run)."""
-    return SentenceTransformer(model_name)
+    """Load the sentence-transformers model (cached in the process-wide registry)."""
+    return get_model(model_name)
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough wordpiece count (~4 chars per token) plus [CLS]/[SEP]."""
+    return len(text) // 4 + 2
+
+
+def length_batches(
+    texts: list[str],
+    token_budget: int = EMBED_TOKEN_BUDGET,
+    max_batch: int = EMBED_MAX_BATCH,
+) -> list[list[int]]:
+    """
+    Group text positions into batches of similar length (shortest first) so little time is
+    spent on padding. A batch grows while batch_size x longest text fits token_budget.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    batches, current = [], []
+    for i in order:
+        longest = _estimate_tokens(texts[i])  # sorted ascending: the newest text is the longest
+        if current and ((len(current) + 1) * longest > token_budget or len(current) >= max_batch):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _encode(model, texts: list[str]) -> np.ndarray:
+    """Encode in length-bucketed batches into one contiguous float32 array, original order."""
+    out = None
+    for batch in length_batches(texts):
+        vectors = model.encode([texts[i] for i in batch], batch_size=len(batch), show_progress_bar=False)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if out is None:
+            out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        out[batch] = vectors
+    return out
+
+
+@traced("embed", count=len)
+def encode_texts(texts: list[str], model_name: str = "all-MiniLM-L6-v2", use_cache: bool = EMBEDDING_CACHE_ENABLED) -> np.ndarray:
+    """
+    Embed texts as a float32 array (one row per text). With the cache on, only texts not
+    seen before for this model go to the model.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    if not use_cache:
+        return _encode(get_embedding_model(model_name), texts)
+
+    cached = embedding_cache.get_many(model_name, texts)
+    miss_pos = [i for i, v in enumerate(cached) if v is None]
+    if miss_pos:
+        miss_texts = [texts[i] for i in miss_pos]
+        fresh = _encode(get_embedding_model(model_name), miss_texts)
+        embedding_cache.put_many(model_name, miss_texts, fresh)
+        for i, vec in zip(miss_pos, fresh):
+            cached[i] = vec
+    return np.vstack(cached)
 
 
 def embed_chunks(chunks: list[dict], model_name: str = "all-MiniLM-L6-v2") -> list[dict]:
     """
-    Compute embeddings for each chunk. Returns list of dicts with 'text', 'index', 'embedding'.
+    Compute embeddings for each chunk (list or ChunkTable). Returns list of dicts with 'text',
+    'index', 'embedding' (and 'page' when the chunk has one).
+    Each 'embedding' is a float32 row view into one contiguous array (no per-chunk lists).
     """
     if not chunks:
         return []
 
-    model = get_embedding_model(model_name)
     texts = [c["text"] for c in chunks]
-    embeddings = model.encode(texts, show_progress_bar=False)
+    embeddings = encode_texts(texts, model_name)
 
-    return [
-        {"index": c["index"], "text": c["text"], "embedding": emb.tolist()}
-        for c, emb in zip(chunks, embeddings)
-    ]
+    out = []
+    for c, emb in zip(chunks, embeddings):
+        row = {"index": c["index"], "text": c["text"], "embedding": emb}
+        if c.get("page"):
+            row["page"] = c["page"]
+        out.append(row)
+    return out
@@ -0,0 +1,166 @@
+"""Embedding cache - on-disk (sqlite) vectors keyed by (model, chunk text hash)."""
+from __future__ import annotations
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB
+
+_lock = threading.Lock()
+_conns: dict[str, sqlite3.Connection] = {}
+_stats = {"hits": 0, "misses": 0, "evicted": 0}
+# path -> {"entries", "bytes", "writes"}: running totals, so writes and get_stats don't scan the table
+_totals: dict[str, dict] = {}
+_LOOKUP_BATCH = 500
+# Re-count the table every this many put_many calls to pick up other processes' writes
+_RESYNC_WRITES = 200
+# Eviction frees down to this fraction of max_mb, so a full cache isn't trimmed on every write
+_EVICT_TO = 0.9
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """One shared connection per cache file (guarded by _lock)."""
+    conn = _conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Generous lock timeout: ingest.py worker processes write to the same file
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+            " nbytes INTEGER NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        _conns[path] = conn
+    return conn
+
+
+def _sync_totals_locked(conn: sqlite3.Connection, path: str) -> dict:
+    entries, nbytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()
+    _totals[path] = {"entries": entries, "bytes": nbytes, "writes": 0}
+    return _totals[path]
+
+
+def _totals_locked(conn: sqlite3.Connection, path: str) -> dict:
+    """Running totals for path, counted once per process (ingest.py workers share the file)."""
+    totals = _totals.get(path)
+    return totals if totals is not None else _sync_totals_locked(conn, path)
+
+
+def get_many(model_name: str, texts: list[str], path: str = EMBEDDING_CACHE_PATH) -> list[np.ndarray | None]:
+    """Cached float32 vector for each text, or None where it isn't cached."""
+    hashes = [text_hash(t) for t in texts]
+    found: dict[str, np.ndarray] = {}
+    with _lock:
+        conn = _connect(path)
+        unique = list(dict.fromkeys(hashes))
+        for i in range(0, len(unique), _LOOKUP_BATCH):
+            part = unique[i:i + _LOOKUP_BATCH]
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                [model_name, *part],
+            ).fetchall()
+            for h, blob in rows:
+                found[h] = np.frombuffer(blob, dtype=np.float32)
+        if found:
+            now = time.time()
+            conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                [(now, model_name, h) for h in found],
+            )
+            conn.commit()
+        hits = sum(1 for h in hashes if h in found)
+        _stats["hits"] += hits
+        _stats["misses"] += len(hashes) - hits
+    return [found.get(h) for h in hashes]
+
+
+def put_many(
+    model_name: str,
+    texts: list[str],
+    vectors: np.ndarray,
+    path: str = EMBEDDING_CACHE_PATH,
+    max_mb: float = EMBEDDING_CACHE_MAX_MB,
+) -> None:
+    """Store vectors for texts, then evict least recently used entries above max_mb."""
+    now = time.time()
+    rows = {}
+    for text, vec in zip(texts, vectors):
+        h = text_hash(text)
+        blob = np.asarray(vec, dtype=np.float32).tobytes()
+        rows[h] = (model_name, h, blob, len(blob), now)
+    with _lock:
+        conn = _connect(path)
+        totals = _totals_locked(conn, path)
+        # Sizes of entries being replaced (primary-key lookups), to keep the totals exact
+        replaced: dict[str, int] = {}
+        hashes = list(rows)
+        for i in range(0, len(hashes), _LOOKUP_BATCH):
+            part = hashes[i:i + _LOOKUP_BATCH]
+            replaced.update(conn.execute(
+                f"SELECT text_hash, nbytes FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                [model_name, *part],
+            ).fetchall())
+        conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", list(rows.values()))
+        totals["entries"] += len(rows) - len(replaced)
+        totals["bytes"] += sum(r[3] for r in rows.values()) - sum(replaced.values())
+        totals["writes"] += 1
+        if totals["writes"] >= _RESYNC_WRITES:
+            totals = _sync_totals_locked(conn, path)
+        _evict_locked(conn, path, totals, max_mb)
+        conn.commit()
+
+
+def _evict_locked(conn: sqlite3.Connection, path: str, totals: dict, max_mb: float) -> None:
+    max_bytes = int(max_mb * 1024 * 1024)
+    if totals["bytes"] <= max_bytes:
+        return
+    totals = _sync_totals_locked(conn, path)  # exact before deleting anything
+    if totals["bytes"] <= max_bytes:
+        return
+    excess = totals["bytes"] - int(max_bytes * _EVICT_TO)
+    cutoff_rows = []
+    freed = 0
+    for rowid, nbytes in conn.execute("SELECT rowid, nbytes FROM embeddings ORDER BY last_used"):
+        cutoff_rows.append((rowid,))
+        freed += nbytes
+        if freed >= excess:
+            break
+    conn.executemany("DELETE FROM embeddings WHERE rowid = ?", cutoff_rows)
+    totals["entries"] -= len(cutoff_rows)
+    totals["bytes"] -= freed
+    _stats["evicted"] += len(cutoff_rows)
+
+
+def get_stats(path: str = EMBEDDING_CACHE_PATH) -> dict:
+    """Hit/miss counters for this process plus what's on disk (running totals, see put_many)."""
+    with _lock:
+        totals = _totals_locked(_connect(path), path)
+        entries, nbytes = totals["entries"], totals["bytes"]
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else None,
+            "entries": entries,
+            "size_mb": round(nbytes / (1024 * 1024), 2),
+        }
+
+
+def clear(path: str = EMBEDDING_CACHE_PATH) -> None:
+    """Delete all cached vectors and reset counters."""
+    with _lock:
+        conn = _connect(path)
+        conn.execute("DELETE FROM embeddings")
+        conn.commit()
+        _totals[path] = {"entries": 0, "bytes": 0, "writes": 0}
+        _stats.update({"hits": 0, "misses": 0, "evicted": 0})
@@ -1,14 +1,140 @@
 """Step 7: Generation - produce an answer from retrieved context + query (simple template)."""
 # No external LLM for minimal setup: we format context + query for visibility.
 # You can plug in OpenAI/Ollama later.
+from config import CONTEXT_TOKEN_BUDGET
+from components.metrics import traced
 
+_SEPARATOR = "\n\n---\n\n"
+# Shortest shared text treated as chunk overlap (shorter matches are likely coincidence)
+_MIN_OVERLAP = 20
 
-def generate_answer(query: str, retrieved_chunks: list[dict]) -> dict:
+_encoding = None  # tiktoken encoding, loaded on first count_tokens(); False if unavailable
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")  # GPT-4o tokenizer
+        except Exception:
+            _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """GPT-4o token count (tiktoken if installed, else ~4 characters per token)."""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is a prefix of right (0 if < _MIN_OVERLAP)."""
+    for k in range(min(len(left), len(right)), _MIN_OVERLAP - 1, -1):
+        if left.endswith(right[:k]):
+            return k
+    return 0
+
+
+def _position(chunk: dict):
+    """(source, chunk_index) from stored metadata, if present."""
+    meta = chunk.get("metadata") or {}
+    if "chunk_index" not in meta:
+        return None
+    return meta.get("source", ""), meta["chunk_index"]
+
+
+def _try_merge(a: dict, b: dict):
+    """Merged span text if a and b overlap/contain each other or are neighbouring chunks, else None."""
+    if b["text"] in a["text"]:
+        return a["text"]
+    if a["text"] in b["text"]:
+        return b["text"]
+    for left, right in ((a, b), (b, a)):
+        k = _overlap(left["text"], right["text"])
+        if k:
+            return left["text"] + right["text"][k:]
+    pa, pb = a["last"], b["first"]
+    if pa and pb and pa[0] == pb[0] and pb[1] == pa[1] + 1:
+        return a["text"] + " " + b["text"]
+    pa, pb = b["last"], a["first"]
+    if pa and pb and pa[0] == pb[0] and pb[1] == pa[1] + 1:
+        return b["text"] + " " + a["text"]
+    return None
+
+
+@traced("pack_context")
+def pack_context(retrieved_chunks: list[dict], token_budget: int = CONTEXT_TOKEN_BUDGET) -> dict:
+    """
+    Merge overlapping or adjacent retrieved chunks back into contiguous spans, then add spans
+    in relevance order (best-ranked chunk first) while they fit token_budget. Returns
+    {'context', 'spans', 'tokens', 'raw_tokens', 'dropped'}.
+    """
+    spans = [
+        {"text": c["text"].strip(), "rank": i, "first": _position(c), "last": _position(c)}
+        for i, c in enumerate(retrieved_chunks)
+        if c.get("text", "").strip()
+    ]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(spans)):
+            for j in range(i + 1, len(spans)):
+                text = _try_merge(spans[i], spans[j])
+                if text is None:
+                    continue
+                a, b = spans[i], spans[j]
+                firsts = [p for p in (a["first"], b["first"]) if p]
+                lasts = [p for p in (a["last"], b["last"]) if p]
+                spans[i] = {
+                    "text": text,
+                    "rank": min(a["rank"], b["rank"]),
+                    "first": min(firsts) if firsts else None,
+                    "last": max(lasts) if lasts else None,
+                }
+                del spans[j]
+                merged = True
+                break
+            if merged:
+                break
+
+    spans.sort(key=lambda s: s["rank"])
+    sep_tokens = count_tokens(_SEPARATOR)
+    chosen, used, dropped = [], 0, 0
+    for span in spans:
+        cost = count_tokens(span["text"]) + (sep_tokens if chosen else 0)
+        if used + cost <= token_budget:
+            chosen.append(span["text"])
+            used += cost
+        elif not chosen:
+            # Best span alone is over budget: keep its beginning
+            text = span["text"][: token_budget * 4]
+            while text and count_tokens(text) > token_budget:
+                text = text[: int(len(text) * 0.9)]
+            chosen.append(text)
+            used = count_tokens(text)
+        else:
+            dropped += 1
+    return {
+        "context": _SEPARATOR.join(chosen),
+        "spans": len(chosen),
+        "tokens": used,
+        "raw_tokens": count_tokens(_SEPARATOR.join(c["text"] for c in retrieved_chunks)),
+        "dropped": dropped,
+    }
+
+
+def generate_answer(query: str, retrieved_chunks: list[dict], token_budget: int = CONTEXT_TOKEN_BUDGET) -> dict:
     """
     Build a simple 'answer' from retrieved context. For demo we concatenate
-    context and echo the query; no API key or model required.
+    context and echo the query; no API key or model required. Context is packed with
+    pack_context (overlaps merged, capped at token_budget).
     """
-    context = "\n\n---\n\n".join(c["text"] for c in retrieved_chunks)
+    packed = pack_context(retrieved_chunks, token_budget)
+    context = packed["context"]
     # First chunk is usually the most relevant (lowest distance) — show it as "key passage"
     key_passage = (retrieved_chunks[0]["text"].strip() if retrieved_chunks else "")
     # Simple template response so the UI can show "what would be sent to an LLM"
@@ -22,4 +148,8 @@ def generate_answer(query: str, retrieved_chunks: list[dict]) -> dict:
         "context_used": context,
         "num_chunks": len(retrieved_chunks),
         "key_passage": key_passage,
+        "context_tokens": packed["tokens"],
+        "raw_context_tokens": packed["raw_tokens"],
+        "num_spans": packed["spans"],
+        "dropped_spans": packed["dropped"],
     }
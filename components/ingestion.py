@@ -0,0 +1,375 @@
+"""Streaming ingestion - PDF pages to ChromaDB through bounded queues (constant memory)."""
+from __future__ import annotations
+import os
+import queue
+import re
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+from config import (
+    CHROMA_DIR,
+    COLLECTION_NAME,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    EMBEDDING_MODEL,
+    EMBED_MAX_BATCH,
+    INGEST_BATCH_SIZE,
+    INGEST_QUEUE_SIZE,
+    PDF_WORKERS,
+    DEDUP_ENABLED,
+    DEDUP_THRESHOLD,
+)
+from components.data_collection import iter_pages
+from components.cleaning import clean_page_text
+from components.chunking import chunk_spans, strip_span
+from components.embedding import get_embedding_model, encode_texts, embed_chunks
+from components.storage import get_or_create_collection, chunk_id, chunk_metadata, rebuild_keyword_index, sync_embeddings
+from components.keyword_index import build_index, add_documents, save_index
+from components import answer_cache
+from components.dedup import NearDuplicateIndex
+from components import metrics
+
+_DONE = object()
+# Sentence / line boundaries used to cut the streaming buffer for non-fixed chunkers
+_SENTENCE_END = re.compile(r"[.!?]\s+")
+
+
+def stream_chunks(
+    pages: Iterable[dict],
+    method: str = "fixed",
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+    segment_chars: int | None = None,
+) -> Iterator[dict]:
+    """
+    Chunk a stream of cleaned pages ({'page', 'text'}) without holding the whole document.
+    Chunks carry the page they start on. Fixed-size chunks are identical to chunk_table on
+    the joined text. Sentence/paragraph chunks are cut at a sentence/line boundary every
+    ~segment_chars, so a chunk never spans two segments.
+    """
+    segment_chars = segment_chars or chunk_size * 8
+    step = max(1, chunk_size - overlap)
+    buffer = ""
+    base = 0  # offset of buffer[0] in the whole joined text
+    page_marks: list[tuple[int, int]] = []  # (offset in joined text, page) for pages still in the buffer
+    index = 0
+
+    def page_at(offset: int) -> int:
+        page = 0
+        for mark, number in page_marks:
+            if mark > offset:
+                break
+            page = number
+        return page
+
+    def emit(spans, text: str, text_base: int):
+        nonlocal index
+        for s, e in spans:
+            chunk = {"index": index, "text": text[s:e]}
+            page = page_at(text_base + s)
+            if page:
+                chunk["page"] = page
+            yield chunk
+            index += 1
+
+    def advance(cut: int):
+        nonlocal buffer, base, page_marks
+        buffer, base = buffer[cut:], base + cut
+        # Keep the mark of the page the new buffer starts in
+        keep = [m for m in page_marks if m[0] > base]
+        earlier = [m for m in page_marks if m[0] <= base]
+        page_marks = earlier[-1:] + keep
+
+    def emit_fixed(final: bool):
+        # Same windows as chunk_text; without final, stop at the first window the buffer can't fill yet
+        start = 0
+        spans = []
+        while start < len(buffer):
+            end = start + chunk_size
+            if not final and end > len(buffer):
+                break
+            s, e = strip_span(buffer, start, min(end, len(buffer)))
+            if s < e:
+                spans.append((s, e))
+            start += step
+        yield from emit(spans, buffer, base)
+        advance(min(start, len(buffer)))
+
+    for page in pages:
+        text = page["text"]
+        if not text:
+            continue
+        if base or buffer:
+            buffer += "\n"  # page separator, as in clean_pages (even if the buffer was just flushed)
+        page_marks.append((base + len(buffer), page.get("page", 0)))
+        buffer += text
+        if len(buffer) < segment_chars:
+            continue
+        if method == "fixed":
+            yield from emit_fixed(final=False)
+            continue
+        cut = max((m.end() for m in _SENTENCE_END.finditer(buffer, 0, len(buffer) - 1)), default=-1)
+        if method == "paragraph" or cut < 0:
+            cut = max(cut, buffer.rfind("\n") + 1)
+        if cut <= 0:
+            continue
+        segment = buffer[:cut]
+        yield from emit(chunk_spans(segment, method, chunk_size, overlap), segment, base)
+        advance(cut)
+
+    if buffer.strip():
+        if method == "fixed":
+            yield from emit_fixed(final=True)
+        else:
+            yield from emit(chunk_spans(buffer, method, chunk_size, overlap), buffer, base)
+
+
+def _clean_page(page: dict):
+    text = clean_page_text(page["text"])
+    return {"page": page["page"], "text": text} if text else None
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _Stage:
+    """One pipeline stage on its own thread: pulls from inq, pushes results to outq."""
+
+    def __init__(self, name: str, stop: threading.Event):
+        self.name = name
+        self.stop = stop
+        self.items = 0
+        self.seconds = 0.0
+        self.waited = 0.0
+        self.error: BaseException | None = None
+
+    def put(self, q: queue.Queue, item) -> bool:
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def drain(self, q: queue.Queue) -> Iterator:
+        while not self.stop.is_set():
+            start = time.perf_counter()
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            finally:
+                self.waited += time.perf_counter() - start
+            if item is _DONE:
+                return
+            yield item
+
+    def run(self, source: Iterable, fn: Callable, outq: queue.Queue | None, count: Callable = lambda r: 1):
+        """Apply fn to each item from source (fn may return None to emit nothing)."""
+        try:
+            it = iter(source)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    self.seconds += time.perf_counter() - start
+                    break
+                result = fn(item)
+                self.seconds += time.perf_counter() - start
+                if result is None:
+                    continue
+                self.items += count(result)
+                if outq is not None and not self.put(outq, result):
+                    return
+        except BaseException as e:
+            self.error = e
+            self.stop.set()
+        finally:
+            if outq is not None:
+                self.put(outq, _DONE)
+
+    def report(self) -> dict:
+        """Items processed and busy time (time spent waiting on the input queue excluded)."""
+        busy = max(self.seconds - self.waited, 0.0)
+        return {
+            "items": self.items,
+            "seconds": round(busy, 3),
+            "per_second": round(self.items / busy, 1) if busy else None,
+        }
+
+
+def ingest_pdf(
+    path: str,
+    chunking_method: str = "fixed",
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+    model_name: str = EMBEDDING_MODEL,
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+    batch_size: int = INGEST_BATCH_SIZE,
+    queue_size: int = INGEST_QUEUE_SIZE,
+    workers: int = PDF_WORKERS,
+    source: str | None = None,
+    only_source: bool = False,
+    dedup_threshold: float | None = DEDUP_THRESHOLD if DEDUP_ENABLED else None,
+) -> dict:
+    """
+    Stream a PDF into ChromaDB: extract -> clean -> chunk -> embed (batched) -> store (batched).
+    Stages run on separate threads joined by bounded queues, so the page text, chunks and
+    vectors in memory depend on batch_size and queue_size, not on document size. Bookkeeping
+    still grows with the number of chunks (small per chunk, but O(document)): the IDs stored
+    before and written in this run, the BM25 index (saved as one file at the end) and, with
+    dedup_threshold set, one MinHash signature per kept chunk.
+    Like sync_embeddings, chunks already stored under the same content-addressed ID are not
+    re-embedded and only get their metadata rewritten if it changed (e.g. page moved), and
+    stored chunks not seen in this run are deleted (only those of `source` if only_source).
+    With dedup_threshold set, near-duplicate chunks are dropped before embedding.
+    Returns {'pages', 'chunks', 'added', 'kept', 'deleted', 'duplicates', 'stages': {stage: {items, seconds, per_second}}, 'total_seconds'}.
+    """
+    source = os.path.basename(path) if source is None else source
+    started = time.perf_counter()
+    stop = threading.Event()
+    names = ["extract", "clean", "chunk", "embed", "store"]
+    stages = {name: _Stage(name, stop) for name in names}
+    pages_q, cleaned_q, chunks_q, vectors_q = (queue.Queue(maxsize=queue_size) for _ in range(4))
+
+    get_embedding_model(model_name)  # load before the stages start timing
+    col = get_or_create_collection(collection_name, persist_dir)
+    existing = set(col.get(where={"source": source} if only_source else None, include=[])["ids"])
+    seen: set[str] = set()
+    occurrences: dict[str, int] = {}
+    index = build_index([], [])
+    counts = {"added": 0, "kept": 0, "duplicates": 0}
+    near_dups = NearDuplicateIndex(dedup_threshold) if dedup_threshold else None
+
+    def assign_ids(batch: list[dict]):
+        if near_dups is not None:
+            unique = [c for c in batch if near_dups.check(c["index"], c["text"]) is None]
+            counts["duplicates"] += len(batch) - len(unique)
+            batch = unique
+            if not batch:
+                return None
+        for c in batch:
+            first = chunk_id(c["text"], source)
+            n = occurrences.get(first, 0)
+            occurrences[first] = n + 1
+            c["id"] = first if n == 0 else chunk_id(c["text"], source, n)
+        return batch
+
+    def embed_batch(batch: list[dict]):
+        new = [c for c in batch if c["id"] not in existing]
+        vectors = encode_texts([c["text"] for c in new], model_name) if new else None
+        return batch, new, vectors
+
+    def store_batch(item):
+        batch, new, vectors = item
+        if new:
+            col.add(
+                ids=[c["id"] for c in new],
+                documents=[c["text"] for c in new],
+                embeddings=vectors,
+                metadatas=[chunk_metadata(c, source) for c in new],
+            )
+        kept = [c for c in batch if c["id"] in existing]
+        if kept:
+            stored = col.get(ids=[c["id"] for c in kept], include=["metadatas"])
+            old_meta = dict(zip(stored["ids"], stored["metadatas"] or [None] * len(stored["ids"])))
+            moved = [c for c in kept if (old_meta.get(c["id"]) or {}) != chunk_metadata(c, source)]
+            if moved:
+                col.update(ids=[c["id"] for c in moved], metadatas=[chunk_metadata(c, source) for c in moved])
+        counts["added"] += len(new)
+        counts["kept"] += len(kept)
+        seen.update(c["id"] for c in batch)
+        add_documents(index, [c["id"] for c in batch], [c["text"] for c in batch])
+        return batch
+
+    threads = [
+        threading.Thread(target=stages["extract"].run, args=(iter_pages(path, workers=workers), lambda p: p, pages_q)),
+        threading.Thread(target=stages["clean"].run, args=(stages["clean"].drain(pages_q), _clean_page, cleaned_q)),
+        threading.Thread(
+            target=stages["chunk"].run,
+            args=(
+                _batched(stream_chunks(stages["chunk"].drain(cleaned_q), chunking_method, chunk_size, overlap), batch_size),
+                assign_ids,
+                chunks_q,
+                len,
+            ),
+        ),
+        threading.Thread(target=stages["embed"].run, args=(stages["embed"].drain(chunks_q), embed_batch, vectors_q, lambda r: len(r[0]))),
+        threading.Thread(target=stages["store"].run, args=(stages["store"].drain(vectors_q), store_batch, None, len)),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for name in names:
+        if stages[name].error is not None:
+            raise stages[name].error
+
+    stale = list(existing - seen)
+    if stale:
+        col.delete(ids=stale)
+    if stale or counts["added"]:
+        answer_cache.invalidate(collection_name)
+    if only_source:
+        # Other documents share the collection: index everything that's stored
+        rebuild_keyword_index(col, collection_name, persist_dir)
+    else:
+        save_index(index, collection_name, persist_dir)
+    reports = {name: stages[name].report() for name in names}
+    for name, report in reports.items():
+        metrics.observe(f"ingest.{name}", report["seconds"], report["items"])
+    total_seconds = time.perf_counter() - started
+    metrics.observe("ingest", total_seconds, stages["extract"].items)
+    return {
+        "pages": stages["extract"].items,
+        "chunks": stages["store"].items,
+        **counts,
+        "deleted": len(stale),
+        "stages": reports,
+        "total_seconds": round(total_seconds, 3),
+    }
+
+
+def index_chunks(
+    chunks,
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+    model_name: str = EMBEDDING_MODEL,
+    source: str = "",
+    batch_size: int = EMBED_MAX_BATCH,
+    progress: Callable[[str, int, int], None] | None = None,
+    check: Callable[[], None] | None = None,
+) -> dict:
+    """
+    Embed already-chunked text in batches, then sync it into the collection (as
+    sync_embeddings). progress(stage, done, total) is called after every batch; check() runs
+    between batches and may raise to abort before anything is stored.
+    Returns sync_embeddings' counts plus 'dimensions'.
+    """
+    total = len(chunks)
+    report = progress or (lambda stage, done, total: None)
+    embeddings: list[dict] = []
+    report("embed", 0, total)
+    for start in range(0, total, batch_size):
+        if check is not None:
+            check()
+        embeddings.extend(embed_chunks(chunks[start:start + batch_size], model_name=model_name))
+        report("embed", len(embeddings), total)
+    if check is not None:
+        check()
+    report("store", 0, total)
+    sync = sync_embeddings(embeddings, collection_name, persist_dir, source=source)
+    report("store", total, total)
+    return {**sync, "dimensions": len(embeddings[0]["embedding"]) if embeddings else 0}
@@ -0,0 +1,129 @@
+"""
+Background jobs - run slow work (embedding + storing a PDF) off the Streamlit script thread.
+Jobs outlive reruns and sessions; a job with the same key as one still queued or running is
+not started twice. Work reports per-stage progress and stops at its next checkpoint when
+cancelled.
+"""
+from __future__ import annotations
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from config import JOB_WORKERS, JOB_HISTORY
+
+ACTIVE = ("queued", "running")
+
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+# job id -> Job, oldest first; finished jobs beyond JOB_HISTORY are forgotten
+_jobs: "OrderedDict[int, Job]" = OrderedDict()
+_ids = itertools.count(1)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """State of one job. Work functions get the Job and call progress() / check()."""
+
+    def __init__(self, key, name: str):
+        self.id = next(_ids)
+        self.key = key
+        self.name = name
+        self.status = "queued"
+        self.stages: dict[str, dict] = {}
+        self.error: Optional[str] = None
+        self.result = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancel_event = threading.Event()
+
+    def progress(self, stage: str, done: int, total: Optional[int] = None) -> None:
+        """Set how far a stage has got (done of total items)."""
+        with _lock:
+            entry = self.stages.setdefault(stage, {"done": 0, "total": None})
+            entry["done"] = done
+            if total is not None:
+                entry["total"] = total
+
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check(self) -> None:
+        """Checkpoint: raise JobCancelled if cancel() was called."""
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} cancelled")
+
+    def snapshot(self) -> dict:
+        with _lock:
+            end = self.finished or time.time()
+            return {
+                "id": self.id,
+                "name": self.name,
+                "status": self.status,
+                "stages": {s: dict(v) for s, v in self.stages.items()},
+                "error": self.error,
+                "result": self.result,
+                "seconds": round(end - self.started, 1) if self.started else 0.0,
+            }
+
+
+def _run(job: Job, fn: Callable, args: tuple, kwargs: dict) -> None:
+    with _lock:
+        if job.cancel_event.is_set():
+            job.status, job.finished = "cancelled", time.time()
+            return
+        job.status, job.started = "running", time.time()
+    try:
+        result = fn(job, *args, **kwargs)
+        status, error = "done", None
+    except Exception as e:
+        result = None
+        status = "cancelled" if job.cancel_event.is_set() else "failed"
+        error = None if status == "cancelled" else f"{type(e).__name__}: {e}"
+    with _lock:
+        job.status, job.result, job.error, job.finished = status, result, error, time.time()
+
+
+def submit(key, fn: Callable, *args, name: str = "", **kwargs) -> Job:
+    """
+    Run fn(job, *args, **kwargs) on the job pool. If a job with this key is still queued or
+    running, that job is returned instead of starting another.
+    """
+    with _lock:
+        for job in _jobs.values():
+            if job.key == key and job.status in ACTIVE:
+                return job
+        job = Job(key, name)
+        _jobs[job.id] = job
+        finished = [i for i, j in _jobs.items() if j.status not in ACTIVE]
+        for i in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del _jobs[i]
+    _executor.submit(_run, job, fn, args, kwargs)
+    return job
+
+
+def get(job_id: int) -> Optional[Job]:
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def cancel(job_id: int) -> bool:
+    """Ask a job to stop; True if it was still queued or running."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job.status not in ACTIVE:
+            return False
+        job.cancel_event.set()
+        return True
+
+
+def list_jobs() -> list[dict]:
+    with _lock:
+        jobs = list(_jobs.values())
+    return [j.snapshot() for j in jobs]
@@ -0,0 +1,111 @@
+"""Keyword index - persistent BM25 inverted index built alongside the vector store."""
+from __future__ import annotations
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from config import CHROMA_DIR, COLLECTION_NAME, BM25_K1, BM25_B
+
+_cache_lock = threading.Lock()
+# index path -> (mtime, index dict)
+_cache: dict[str, tuple[float, dict]] = {}
+
+
+def _tokens(s: str) -> list[str]:
+    """Lowercase words, strip punctuation (keeps repeats for term frequency)."""
+    return re.findall(r"\b\w+\b", (s or "").lower())
+
+
+def index_path(collection_name: str = COLLECTION_NAME, persist_dir: str = CHROMA_DIR) -> str:
+    """Where the keyword index for a collection lives (next to the ChromaDB files)."""
+    return os.path.join(persist_dir, f"{collection_name}.bm25.json")
+
+
+def build_index(ids: list[str], documents: list[str]) -> dict:
+    """
+    Build an inverted index: term -> [[doc_position, term_frequency], ...] plus per-document
+    lengths, so queries only touch postings for their own terms.
+    """
+    return add_documents({"ids": [], "doc_lens": [], "avgdl": 0.0, "postings": {}}, ids, documents)
+
+
+def add_documents(index: dict, ids: list[str], documents: list[str]) -> dict:
+    """Append documents to an index in place (used when ingesting in batches). Returns index."""
+    postings = index["postings"]
+    doc_lens = index["doc_lens"]
+    for doc_id, doc in zip(ids, documents):
+        pos = len(index["ids"])
+        index["ids"].append(doc_id)
+        counts = Counter(_tokens(doc))
+        doc_lens.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append([pos, tf])
+    n = len(index["ids"])
+    index["avgdl"] = (sum(doc_lens) / n) if n else 0.0
+    return index
+
+
+def save_index(index: dict, collection_name: str = COLLECTION_NAME, persist_dir: str = CHROMA_DIR) -> str:
+    """Write the index atomically and return its path."""
+    os.makedirs(persist_dir, exist_ok=True)
+    path = index_path(collection_name, persist_dir)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    with _cache_lock:
+        _cache.pop(path, None)
+    return path
+
+
+def load_index(collection_name: str = COLLECTION_NAME, persist_dir: str = CHROMA_DIR) -> dict | None:
+    """Load the index (cached in memory until the file changes). None if it was never built."""
+    path = index_path(collection_name, persist_dir)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with open(path, encoding="utf-8") as f:
+        index = json.load(f)
+    with _cache_lock:
+        _cache[path] = (mtime, index)
+    return index
+
+
+def delete_index(collection_name: str = COLLECTION_NAME, persist_dir: str = CHROMA_DIR) -> None:
+    """Remove the index file and its cached copy (no error if missing)."""
+    path = index_path(collection_name, persist_dir)
+    with _cache_lock:
+        _cache.pop(path, None)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def search(index: dict, query: str, top_k: int, k1: float = BM25_K1, b: float = BM25_B) -> list[tuple[str, float]]:
+    """BM25 over the postings of the query terms. Returns [(id, score), ...] best first."""
+    n = len(index["ids"])
+    if not n:
+        return []
+    doc_lens = index["doc_lens"]
+    avgdl = index["avgdl"] or 1.0
+    scores: dict[int, float] = {}
+    for term in set(_tokens(query)):
+        plist = index["postings"].get(term)
+        if not plist:
+            continue
+        idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+        for pos, tf in plist:
+            norm = tf + k1 * (1 - b + b * doc_lens[pos] / avgdl)
+            scores[pos] = scores.get(pos, 0.0) + idf * tf * (k1 + 1) / norm
+    best = heapq.nlargest(top_k, scores.items(), key=lambda kv: kv[1])
+    return [(index["ids"][pos], score) for pos, score in best]
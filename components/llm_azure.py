@@ -1,12 +1,39 @@
 """Optional: generate a direct answer using Azure OpenAI (e.g. GPT-4o)."""
-from typing import Optional
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Iterator, Optional
 
 from config import (
     AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_ENDPOINT,
     AZURE_OPENAI_DEPLOYMENT,
     AZURE_OPENAI_API_VERSION,
+    AZURE_OPENAI_TIMEOUT,
+    AZURE_OPENAI_MAX_RETRIES,
+    AZURE_OPENAI_BACKOFF_BASE,
+    AZURE_OPENAI_BACKOFF_MAX,
+    AZURE_OPENAI_MAX_CONCURRENCY,
 )
+from components import metrics
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant. Answer the user's question using ONLY the provided context. "
+    "If the context does not contain enough information, say so briefly. Keep the answer direct and concise."
+)
+NOT_CONFIGURED = "Azure OpenAI not configured. Set AZURE_OPENAI_API_KEY and AZURE_OPENAI_ENDPOINT (or use Streamlit secrets)."
+NOT_INSTALLED = "Install the openai package: pip install openai"
+
+_client_lock = threading.Lock()
+# (endpoint, deployment, api_version, key) -> AzureOpenAI
+_clients: dict = {}
+# event loop -> {client key: AsyncAzureOpenAI, "semaphore": asyncio.Semaphore}
+_async_state: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+# Recent calls: {"ttft", "total", "retries", "stream"} in seconds
+_latencies: deque = deque(maxlen=200)
 
 
 def is_azure_configured(
@@ -19,6 +46,121 @@ def is_azure_configured(
     return bool(key and url)
 
 
+def _settings(api_key, endpoint, deployment, api_version) -> tuple:
+    key = api_key or AZURE_OPENAI_API_KEY
+    url = (endpoint or AZURE_OPENAI_ENDPOINT or "").rstrip("/")
+    deploy = deployment or AZURE_OPENAI_DEPLOYMENT
+    version = api_version or AZURE_OPENAI_API_VERSION
+    return key, url, deploy, version
+
+
+def _messages(query: str, context: str) -> list[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context:\n\n{context}\n\nQuestion: {query}"},
+    ]
+
+
+def get_client(key: str, url: str, deploy: str, version: str):
+    """Pooled AzureOpenAI client per endpoint/deployment, so HTTP connections are reused."""
+    from openai import AzureOpenAI
+
+    cache_key = (url, deploy, version, key)
+    with _client_lock:
+        client = _clients.get(cache_key)
+        if client is None:
+            # Retries are handled here (_retry_delay) so they can be jittered and counted
+            client = AzureOpenAI(
+                api_key=key, api_version=version, azure_endpoint=url,
+                timeout=AZURE_OPENAI_TIMEOUT, max_retries=0,
+            )
+            _clients[cache_key] = client
+        return client
+
+
+def _get_async_client(key: str, url: str, deploy: str, version: str):
+    """Pooled AsyncAzureOpenAI per running event loop (async HTTP pools can't cross loops)."""
+    from openai import AsyncAzureOpenAI
+
+    state = _async_state.setdefault(asyncio.get_running_loop(), {})
+    cache_key = (url, deploy, version, key)
+    client = state.get(cache_key)
+    if client is None:
+        client = AsyncAzureOpenAI(
+            api_key=key, api_version=version, azure_endpoint=url,
+            timeout=AZURE_OPENAI_TIMEOUT, max_retries=0,
+        )
+        state[cache_key] = client
+    return client
+
+
+def _get_semaphore(limit: int) -> asyncio.Semaphore:
+    state = _async_state.setdefault(asyncio.get_running_loop(), {})
+    sem = state.get(("semaphore", limit))
+    if sem is None:
+        sem = state[("semaphore", limit)] = asyncio.Semaphore(limit)
+    return sem
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """
+    Seconds to wait before retrying, or None if the error isn't worth retrying (429s,
+    timeouts, connection errors and 5xx are). Full jitter; honours Retry-After if sent.
+    """
+    import openai
+
+    retryable = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+    if not isinstance(error, retryable) or attempt >= AZURE_OPENAI_MAX_RETRIES:
+        return None
+    delay = random.uniform(0, min(AZURE_OPENAI_BACKOFF_MAX, AZURE_OPENAI_BACKOFF_BASE * 2 ** attempt))
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        delay = max(delay, min(float(retry_after), AZURE_OPENAI_BACKOFF_MAX))
+    except (TypeError, ValueError):
+        pass
+    return delay
+
+
+def _record(start: float, first_token: Optional[float], retries: int, stream: bool, timing: Optional[dict]) -> None:
+    """Add the call to the process-wide window; also copy it into the caller's timing dict."""
+    end = time.perf_counter()
+    entry = {
+        "ttft": (first_token or end) - start,
+        "total": end - start,
+        "retries": retries,
+        "stream": stream,
+    }
+    _latencies.append(entry)
+    if timing is not None:
+        timing.update(entry)
+    metrics.observe("llm", end - start)
+    metrics.observe("llm.ttft", (first_token or end) - start)
+
+
+def get_latency_stats() -> dict:
+    """
+    Time-to-first-token and total latency (seconds) of recent calls in this process, all
+    sessions: p50, p95. For one call's own timing, pass timing={} to the call.
+    """
+    calls = list(_latencies)
+    if not calls:
+        return {"calls": 0}
+
+    def pct(values, p):
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))], 3)
+
+    ttft = [c["ttft"] for c in calls]
+    total = [c["total"] for c in calls]
+    return {
+        "calls": len(calls),
+        "ttft_p50": pct(ttft, 50), "ttft_p95": pct(ttft, 95),
+        "total_p50": pct(total, 50), "total_p95": pct(total, 95),
+        "retries": sum(c["retries"] for c in calls),
+    }
+
+
 def generate_with_azure(
     query: str,
     context: str,
@@ -27,44 +169,124 @@ def generate_with_azure(
     endpoint: Optional[str] = None,
     deployment: Optional[str] = None,
     api_version: Optional[str] = None,
+    timing: Optional[dict] = None,
 ) -> tuple[Optional[str], Optional[str]]:
     """
     Call Azure OpenAI chat completions to get a direct answer from the context.
     Returns (answer_text, error_message). If success, error_message is None.
+    A timing dict gets this call's 'ttft', 'total' (seconds), 'retries' and 'stream'.
     """
-    key = api_key or AZURE_OPENAI_API_KEY
-    url = (endpoint or AZURE_OPENAI_ENDPOINT or "").rstrip("/")
-    deploy = deployment or AZURE_OPENAI_DEPLOYMENT
-    version = api_version or AZURE_OPENAI_API_VERSION
-
+    key, url, deploy, version = _settings(api_key, endpoint, deployment, api_version)
     if not key or not url:
-        return None, "Azure OpenAI not configured. Set AZURE_OPENAI_API_KEY and AZURE_OPENAI_ENDPOINT (or use Streamlit secrets)."
+        return None, NOT_CONFIGURED
+    try:
+        client = get_client(key, url, deploy, version)
+    except ImportError:
+        return None, NOT_INSTALLED
+
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        try:
+            response = client.chat.completions.create(model=deploy, messages=_messages(query, context), max_tokens=1024)
+            text = response.choices[0].message.content if response.choices else None
+            _record(start, None, attempt, stream=False, timing=timing)
+            return (text or "", None)
+        except Exception as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None:
+                metrics.observe("llm", time.perf_counter() - start, error=True)
+                return None, str(e)
+            attempt += 1
+            time.sleep(delay)
 
+
+def stream_with_azure(
+    query: str,
+    context: str,
+    *,
+    api_key: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    deployment: Optional[str] = None,
+    api_version: Optional[str] = None,
+    timing: Optional[dict] = None,
+) -> Iterator[str]:
+    """
+    Stream the answer as text pieces as they arrive. Retries (with backoff) only happen
+    before the first token; errors are raised (RuntimeError if not configured). A timing
+    dict is filled like generate_with_azure's once the stream is exhausted.
+    """
+    key, url, deploy, version = _settings(api_key, endpoint, deployment, api_version)
+    if not key or not url:
+        raise RuntimeError(NOT_CONFIGURED)
     try:
-        from openai import AzureOpenAI
+        client = get_client(key, url, deploy, version)
     except ImportError:
-        return None, "Install the openai package: pip install openai"
-
-    client = AzureOpenAI(
-        api_key=key,
-        api_version=version,
-        azure_endpoint=url,
-    )
-    system = (
-        "You are a helpful assistant. Answer the user's question using ONLY the provided context. "
-        "If the context does not contain enough information, say so briefly. Keep the answer direct and concise."
-    )
-    user_content = f"Context:\n\n{context}\n\nQuestion: {query}"
+        raise RuntimeError(NOT_INSTALLED)
+
+    start = time.perf_counter()
+    first_token = None
+    attempt = 0
+    while True:
+        try:
+            stream = client.chat.completions.create(
+                model=deploy, messages=_messages(query, context), max_tokens=1024, stream=True,
+            )
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    yield delta
+            _record(start, first_token, attempt, stream=True, timing=timing)
+            return
+        except Exception as e:
+            delay = _retry_delay(e, attempt) if first_token is None else None
+            if delay is None:
+                metrics.observe("llm", time.perf_counter() - start, error=True)
+                raise
+            attempt += 1
+            time.sleep(delay)
+
+
+async def agenerate_with_azure(
+    query: str,
+    context: str,
+    *,
+    api_key: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    deployment: Optional[str] = None,
+    api_version: Optional[str] = None,
+    max_concurrency: int = AZURE_OPENAI_MAX_CONCURRENCY,
+    timing: Optional[dict] = None,
+) -> tuple[Optional[str], Optional[str]]:
+    """
+    Async generate_with_azure: at most max_concurrency calls in flight per event loop
+    (e.g. asyncio.gather over many questions). Returns (answer_text, error_message).
+    """
+    key, url, deploy, version = _settings(api_key, endpoint, deployment, api_version)
+    if not key or not url:
+        return None, NOT_CONFIGURED
     try:
-        response = client.chat.completions.create(
-            model=deploy,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user_content},
-            ],
-            max_tokens=1024,
-        )
-        text = response.choices[0].message.content if response.choices else None
-        return (text or "", None)
-    except Exception as e:
-        return None, str(e)
+        client = _get_async_client(key, url, deploy, version)
+    except ImportError:
+        return None, NOT_INSTALLED
+
+    async with _get_semaphore(max_concurrency):
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = await client.chat.completions.create(
+                    model=deploy, messages=_messages(query, context), max_tokens=1024,
+                )
+                text = response.choices[0].message.content if response.choices else None
+                _record(start, None, attempt, stream=False, timing=timing)
+                return (text or "", None)
+            except Exception as e:
+                delay = _retry_delay(e, attempt)
+                if delay is None:
+                    metrics.observe("llm", time.perf_counter() - start, error=True)
+                    return None, str(e)
+                attempt += 1
+                await asyncio.sleep(delay)
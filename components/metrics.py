@@ -0,0 +1,222 @@
+"""Stage metrics - timers and counters per pipeline stage, exported as JSON or Prometheus text."""
+from __future__ import annotations
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from config import METRICS_ENABLED, METRICS_WINDOW
+
+_lock = threading.Lock()
+_enabled = METRICS_ENABLED
+# stage -> {"calls", "errors", "items", "seconds", "max", "rss_delta_mb", "recent": deque of durations}
+_stages: dict[str, dict] = {}
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 0
+
+
+def _rss_bytes() -> int:
+    """Current resident set size (Linux /proc; falls back to the peak from getrusage, else 0)."""
+    if _PAGE_SIZE:
+        try:
+            with open("/proc/self/statm", "rb") as f:
+                return int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, ValueError, IndexError):
+            pass
+    try:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(on: bool) -> None:
+    """Turn recording on/off at runtime; when off, span/traced cost one flag check."""
+    global _enabled
+    _enabled = bool(on)
+
+
+def observe(stage: str, seconds: float, items: int = 1, error: bool = False, rss_delta: int = 0) -> None:
+    """Record one finished call of a stage (for timings measured elsewhere)."""
+    if not _enabled:
+        return
+    with _lock:
+        s = _stages.get(stage)
+        if s is None:
+            s = _stages[stage] = {
+                "calls": 0, "errors": 0, "items": 0, "seconds": 0.0, "max": 0.0,
+                "rss_delta_mb": 0.0, "recent": deque(maxlen=METRICS_WINDOW),
+            }
+        s["calls"] += 1
+        s["errors"] += int(error)
+        s["items"] += items
+        s["seconds"] += seconds
+        s["max"] = max(s["max"], seconds)
+        s["rss_delta_mb"] = max(s["rss_delta_mb"], rss_delta / (1024 * 1024))
+        s["recent"].append(seconds)
+
+
+class _Span:
+    """Times a block; .add(n) counts items processed (defaults to 1 per call)."""
+
+    __slots__ = ("stage", "items", "_start", "_rss")
+
+    def __init__(self, stage: str, items: Optional[int] = None):
+        self.stage = stage
+        self.items = items
+
+    def add(self, n: int = 1) -> None:
+        self.items = (self.items or 0) + n
+
+    def __enter__(self):
+        self._rss = _rss_bytes()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        observe(
+            self.stage, seconds, 1 if self.items is None else self.items,
+            error=exc_type is not None, rss_delta=_rss_bytes() - self._rss,
+        )
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def add(self, n: int = 1) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage: str, items: Optional[int] = None):
+    """
+    Context manager timing one call of `stage`:
+        with span("store") as s:
+            ...; s.add(len(batch))
+    """
+    return _Span(stage, items) if _enabled else _NO_SPAN
+
+
+def traced(stage: str, count: Optional[Callable] = None):
+    """
+    Decorator recording each call of the function as `stage`. count(result) gives the items
+    processed (e.g. len); 1 per call otherwise. Works on plain and async functions.
+    """
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                with _Span(stage) as s:
+                    result = await fn(*args, **kwargs)
+                    if count is not None:
+                        s.items = count(result)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(stage) as s:
+                result = fn(*args, **kwargs)
+                if count is not None:
+                    s.items = count(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def _percentile(ordered: list[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def get_stats() -> dict:
+    """
+    Per stage: calls, errors, items, total/max seconds, p50/p95 over the last METRICS_WINDOW
+    calls, items per second and the largest RSS growth seen during one call (MB).
+    """
+    with _lock:
+        snapshot = {name: {**s, "recent": sorted(s["recent"])} for name, s in _stages.items()}
+    out = {}
+    for name, s in sorted(snapshot.items()):
+        recent = s.pop("recent")
+        out[name] = {
+            **s,
+            "seconds": round(s["seconds"], 6),
+            "max": round(s["max"], 6),
+            "rss_delta_mb": round(s["rss_delta_mb"], 1),
+            "p50": round(_percentile(recent, 50), 6) if recent else None,
+            "p95": round(_percentile(recent, 95), 6) if recent else None,
+            "per_second": round(s["items"] / s["seconds"], 1) if s["seconds"] else None,
+        }
+    return out
+
+
+def to_json(indent: Optional[int] = 2) -> str:
+    return json.dumps({
+        "enabled": _enabled,
+        "rss_mb": round(_rss_bytes() / (1024 * 1024), 1),
+        "stages": get_stats(),
+    }, indent=indent)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(prefix: str = "rag") -> str:
+    """Prometheus text exposition format (stage latency as a summary, plus counters)."""
+    stats = get_stats()
+    lines = [
+        f"# HELP {prefix}_stage_duration_seconds Time spent per stage call (quantiles over recent calls).",
+        f"# TYPE {prefix}_stage_duration_seconds summary",
+    ]
+    for name, s in stats.items():
+        stage = _label(name)
+        for q, key in (("0.5", "p50"), ("0.95", "p95")):
+            if s[key] is not None:
+                lines.append(f'{prefix}_stage_duration_seconds{{stage="{stage}",quantile="{q}"}} {s[key]}')
+        lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{stage}"}} {s["seconds"]}')
+        lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{stage}"}} {s["calls"]}')
+    for metric, key, help_text in (
+        ("stage_items_total", "items", "Items (pages, chunks, queries...) processed per stage."),
+        ("stage_errors_total", "errors", "Stage calls that raised."),
+    ):
+        lines.append(f"# HELP {prefix}_{metric} {help_text}")
+        lines.append(f"# TYPE {prefix}_{metric} counter")
+        for name, s in stats.items():
+            lines.append(f'{prefix}_{metric}{{stage="{_label(name)}"}} {s[key]}')
+    lines.append(f"# HELP {prefix}_process_resident_memory_bytes Resident memory of this process.")
+    lines.append(f"# TYPE {prefix}_process_resident_memory_bytes gauge")
+    lines.append(f"{prefix}_process_resident_memory_bytes {_rss_bytes()}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Drop all recorded metrics."""
+    with _lock:
+        _stages.clear()
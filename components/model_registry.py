@@ -0,0 +1,132 @@
+"""Shared embedding model registry - load each SentenceTransformer once per process."""
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from config import EMBEDDING_MODEL, MODEL_CACHE_MAX_MB
+
+_lock = threading.Lock()
+_load_locks: dict[str, threading.Lock] = {}
+# name -> {"model", "size_mb", "load_seconds"}; order = least recently used first
+_models: "OrderedDict[str, dict]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "load_seconds": {}}
+_warmup: dict = {"thread": None, "error": None}
+
+
+def _model_size_mb(model) -> float:
+    """Estimate resident size from the model's parameters and buffers."""
+    try:
+        total = sum(p.numel() * p.element_size() for p in model.parameters())
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+        return total / (1024 * 1024)
+    except Exception:
+        return 0.0
+
+
+def _evict_locked(max_mb: float, keep: str) -> None:
+    """Drop least recently used models until the total fits max_mb. Caller holds _lock."""
+    total = sum(m["size_mb"] for m in _models.values())
+    for name in list(_models.keys()):
+        if total <= max_mb:
+            break
+        if name == keep:
+            continue
+        total -= _models.pop(name)["size_mb"]
+        _stats["evictions"] += 1
+
+
+def get_model(model_name: str = EMBEDDING_MODEL, max_mb: float = MODEL_CACHE_MAX_MB):
+    """
+    Return a loaded SentenceTransformer, loading it on first use. Thread-safe: concurrent
+    callers asking for the same model wait for a single load instead of loading twice.
+    """
+    with _lock:
+        entry = _models.get(model_name)
+        if entry is not None:
+            _models.move_to_end(model_name)
+            _stats["hits"] += 1
+            return entry["model"]
+        load_lock = _load_locks.setdefault(model_name, threading.Lock())
+
+    with load_lock:
+        with _lock:
+            entry = _models.get(model_name)
+            if entry is not None:
+                _models.move_to_end(model_name)
+                _stats["hits"] += 1
+                return entry["model"]
+            _stats["misses"] += 1
+
+        from sentence_transformers import SentenceTransformer
+
+        start = time.perf_counter()
+        model = SentenceTransformer(model_name)
+        elapsed = time.perf_counter() - start
+
+        with _lock:
+            _models[model_name] = {
+                "model": model,
+                "size_mb": _model_size_mb(model),
+                "load_seconds": elapsed,
+            }
+            _stats["load_seconds"][model_name] = elapsed
+            _evict_locked(max_mb, keep=model_name)
+        return model
+
+
+def warm_up(model_names: list[str] | None = None) -> dict:
+    """Preload models at startup. Returns {model_name: load_seconds} (0.0 if already resident)."""
+    loaded = {}
+    for name in model_names or [EMBEDDING_MODEL]:
+        with _lock:
+            resident = name in _models
+        get_model(name)
+        loaded[name] = 0.0 if resident else _stats["load_seconds"].get(name, 0.0)
+    return loaded
+
+
+def warm_up_async(model_names: list[str] | None = None, also: tuple[Callable, ...] = ()) -> threading.Thread:
+    """
+    warm_up() (then each of `also`, e.g. opening the vector store) in a daemon thread, started
+    once per process; later calls return the same thread. Callers needing a model meanwhile
+    just wait for its load in get_model(). Failures are reported in get_stats()['warmup_error'].
+    """
+    with _lock:
+        if _warmup["thread"] is not None:
+            return _warmup["thread"]
+
+        def run():
+            try:
+                warm_up(model_names)
+                for fn in also:
+                    fn()
+            except Exception as e:
+                _warmup["error"] = repr(e)
+
+        _warmup["thread"] = threading.Thread(target=run, name="warm-up", daemon=True)
+        _warmup["thread"].start()
+        return _warmup["thread"]
+
+
+def get_stats() -> dict:
+    """Counters for the UI: hits, misses, evictions, load times and resident models."""
+    with _lock:
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "evictions": _stats["evictions"],
+            "load_seconds": dict(_stats["load_seconds"]),
+            "resident": {name: round(m["size_mb"], 1) for name, m in _models.items()},
+            "resident_mb": round(sum(m["size_mb"] for m in _models.values()), 1),
+            "warming_up": _warmup["thread"] is not None and _warmup["thread"].is_alive(),
+            "warmup_error": _warmup["error"],
+        }
+
+
+def clear() -> None:
+    """Unload all models and reset counters."""
+    with _lock:
+        _models.clear()
+        _stats.update({"hits": 0, "misses": 0, "evictions": 0, "load_seconds": {}})
@@ -0,0 +1,173 @@
+"""
+Per-document collections shared by all sessions. A document's collection is named from its
+content hash and the settings that shape its chunks, so two sessions uploading the same PDF
+with the same settings share one index, and storing never touches another document's index.
+Idle collections expire after a TTL; above the global count/size cap the least recently used
+ones are dropped. Pinned collections (e.g. loaded from a snapshot) are never evicted. Bookkeeping is kept in {persist_dir}/collections.json.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from config import (
+    CHROMA_DIR,
+    VECTOR_STORE_BACKEND,
+    COLLECTION_TTL,
+    COLLECTIONS_MAX,
+    COLLECTIONS_MAX_MB,
+)
+from components.storage import delete_collection
+
+_PREFIX = "doc_"
+# Last-used times are written to disk at most this often (registering/evicting always writes)
+_SAVE_INTERVAL = 30.0
+
+_lock = threading.RLock()
+# abs persist_dir -> {"entries": {name: entry}, "saved": time of last write}
+_registries: dict[str, dict] = {}
+_stats = {"evicted_ttl": 0, "evicted_lru": 0}
+
+
+def collection_name_for(file_hash: str, *settings) -> str:
+    """Collection for a document (content hash) chunked/embedded with these settings."""
+    key = "\x00".join([file_hash, *map(str, settings)])
+    return _PREFIX + hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+
+
+def _path(persist_dir: str) -> str:
+    return os.path.join(persist_dir, "collections.json")
+
+
+def _registry(persist_dir: str) -> dict:
+    """In-memory registry for persist_dir, loaded from disk on first use. Caller holds _lock."""
+    key = os.path.abspath(persist_dir)
+    reg = _registries.get(key)
+    if reg is None:
+        try:
+            with open(_path(persist_dir), encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        reg = _registries[key] = {"entries": entries, "saved": time.time()}
+    return reg
+
+
+def _save(persist_dir: str, reg: dict) -> None:
+    os.makedirs(persist_dir, exist_ok=True)
+    tmp = _path(persist_dir) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(reg["entries"], f, indent=1)
+    os.replace(tmp, _path(persist_dir))
+    reg["saved"] = time.time()
+
+
+def register(
+    name: str,
+    source: str,
+    chunks: int,
+    size_bytes: int,
+    persist_dir: str = CHROMA_DIR,
+    backend: str = VECTOR_STORE_BACKEND,
+    pinned: bool = False,
+    snapshot_id: Optional[str] = None,
+) -> None:
+    """Record a stored collection (or refresh its size after a re-store)."""
+    now = time.time()
+    with _lock:
+        reg = _registry(persist_dir)
+        entry = reg["entries"].get(name) or {"created": now}
+        entry.update({"source": source, "chunks": chunks, "bytes": size_bytes, "backend": backend, "last_used": now})
+        entry.update({"pinned": pinned, "snapshot_id": snapshot_id})
+        reg["entries"][name] = entry
+        _save(persist_dir, reg)
+
+
+def exists(name: str, persist_dir: str = CHROMA_DIR) -> bool:
+    with _lock:
+        return name in _registry(persist_dir)["entries"]
+
+
+def touch(name: str, persist_dir: str = CHROMA_DIR) -> None:
+    """Mark a collection as used now (queries keep it from expiring)."""
+    now = time.time()
+    with _lock:
+        reg = _registry(persist_dir)
+        entry = reg["entries"].get(name)
+        if entry is None:
+            return
+        entry["last_used"] = now
+        if now - reg["saved"] > _SAVE_INTERVAL:
+            _save(persist_dir, reg)
+
+
+def evict(
+    persist_dir: str = CHROMA_DIR,
+    ttl: float = COLLECTION_TTL,
+    max_collections: int = COLLECTIONS_MAX,
+    max_mb: float = COLLECTIONS_MAX_MB,
+    keep: tuple = (),
+) -> list[str]:
+    """
+    Drop collections idle longer than ttl, then least recently used ones until at most
+    max_collections remain and their estimated size fits max_mb. Pinned collections and names
+    in `keep` (e.g. the caller's own collection) are never dropped. Returns the dropped names.
+    """
+    now = time.time()
+    with _lock:
+        reg = _registry(persist_dir)
+        entries = reg["entries"]
+        keep = set(keep) | {n for n, e in entries.items() if e.get("pinned")}
+        victims = [n for n, e in entries.items() if n not in keep and now - e["last_used"] > ttl]
+        _stats["evicted_ttl"] += len(victims)
+        remaining = sorted((n for n in entries if n not in victims), key=lambda n: entries[n]["last_used"])
+        total_mb = sum(entries[n]["bytes"] for n in remaining) / (1024 * 1024)
+        count = len(remaining)
+        for n in remaining:
+            if count <= max_collections and total_mb <= max_mb:
+                break
+            if n in keep:
+                continue
+            victims.append(n)
+            count -= 1
+            total_mb -= entries[n]["bytes"] / (1024 * 1024)
+            _stats["evicted_lru"] += 1
+        for n in victims:
+            delete_collection(n, persist_dir, backend=entries[n].get("backend", VECTOR_STORE_BACKEND))
+            del entries[n]
+        if victims:
+            _save(persist_dir, reg)
+        return victims
+
+
+def drop(name: str, persist_dir: str = CHROMA_DIR) -> bool:
+    """Delete a registered collection now, pinned or not. Returns False if it wasn't registered."""
+    with _lock:
+        reg = _registry(persist_dir)
+        entry = reg["entries"].pop(name, None)
+        if entry is None:
+            return False
+        delete_collection(name, persist_dir, backend=entry.get("backend", VECTOR_STORE_BACKEND))
+        _save(persist_dir, reg)
+        return True
+
+
+def get_stats(persist_dir: str = CHROMA_DIR) -> dict:
+    """Registered collections, their total chunks and estimated size, and eviction counts."""
+    with _lock:
+        entries = _registry(persist_dir)["entries"]
+        return {
+            "collections": len(entries),
+            "chunks": sum(e["chunks"] for e in entries.values()),
+            "size_mb": round(sum(e["bytes"] for e in entries.values()) / (1024 * 1024), 1),
+            **_stats,
+        }
+
+
+def info(name: str, persist_dir: str = CHROMA_DIR) -> Optional[dict]:
+    with _lock:
+        entry = _registry(persist_dir)["entries"].get(name)
+        return dict(entry) if entry else None
@@ -0,0 +1,63 @@
+"""Stage cache - reuse pipeline results across Streamlit reruns (keyed by file hash + params)."""
+from __future__ import annotations
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from config import PIPELINE_CACHE_MAX_ENTRIES
+
+_lock = threading.Lock()
+# stage -> OrderedDict(key -> result), least recently used first
+_entries: dict[str, "OrderedDict[tuple, Any]"] = {}
+_stats: dict[str, dict] = {}
+
+
+def content_hash(data: bytes) -> str:
+    """Stable key for uploaded file content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def run_stage(
+    stage: str,
+    key: tuple,
+    compute: Callable[[], Any],
+    max_entries: int = PIPELINE_CACHE_MAX_ENTRIES,
+) -> tuple[Any, bool]:
+    """
+    Return (result, hit). On a miss, compute() runs and its result is kept; each stage keeps
+    at most max_entries results (least recently used dropped first).
+    """
+    with _lock:
+        stage_entries = _entries.setdefault(stage, OrderedDict())
+        stage_stats = _stats.setdefault(stage, {"hits": 0, "misses": 0})
+        if key in stage_entries:
+            stage_entries.move_to_end(key)
+            stage_stats["hits"] += 1
+            return stage_entries[key], True
+        stage_stats["misses"] += 1
+
+    result = compute()
+
+    with _lock:
+        stage_entries[key] = result
+        stage_entries.move_to_end(key)
+        while len(stage_entries) > max_entries:
+            stage_entries.popitem(last=False)
+    return result, False
+
+
+def get_stats() -> dict:
+    """Per-stage {hits, misses, entries} for the UI."""
+    with _lock:
+        return {
+            stage: {**counts, "entries": len(_entries.get(stage, ()))}
+            for stage, counts in _stats.items()
+        }
+
+
+def clear() -> None:
+    """Drop all cached results and counters."""
+    with _lock:
+        _entries.clear()
+        _stats.clear()
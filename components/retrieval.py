@@ -1,10 +1,25 @@
 """Step 6: Retrieval - find the most relevant chunks (semantic or keyword)."""
-from sentence_transformers import SentenceTransformer
-import chromadb
 import re
-from config import CHROMA_DIR, COLLECTION_NAME, TOP_K_RETRIEVAL, EMBEDDING_MODEL
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from config import (
+    CHROMA_DIR,
+    COLLECTION_NAME,
+    TOP_K_RETRIEVAL,
+    EMBEDDING_MODEL,
+    HYBRID_OVERFETCH,
+    HYBRID_BRANCH_TIMEOUT,
+    HYBRID_WORKERS,
+    RRF_K,
+)
+from components.model_registry import get_model
+from components.storage import get_collection
+from components.keyword_index import build_index, save_index, load_index, search as bm25_search
+from components import metrics
+from components.metrics import traced
 
 
+@traced("retrieve.semantic")
 def retrieve(
     query: str,
     top_k: int = TOP_K_RETRIEVAL,
@@ -13,23 +28,26 @@ def retrieve(
     model_name: str = EMBEDDING_MODEL,
 ) -> list[dict]:
     """
-    Semantic: embed the query, search ChromaDB by similarity. Return list of dicts with 'text', 'metadata', 'distance'.
+    Semantic: embed the query, search the vector store by similarity. Return list of dicts with 'text', 'metadata', 'distance'.
     """
-    client = chromadb.PersistentClient(path=persist_dir)
-    col = client.get_collection(collection_name)
-    model = SentenceTransformer(model_name)
+    col = get_collection(collection_name, persist_dir)
+    model = get_model(model_name)
     query_embedding = model.encode([query], show_progress_bar=False)[0].tolist()
 
     results = col.query(query_embeddings=[query_embedding], n_results=top_k, include=["documents", "metadatas", "distances"])
+    return _query_results(results, 0)
 
+
+def _query_results(results: dict, q: int) -> list[dict]:
+    """Turn row q of a vector store query response into [{id, text, metadata, distance}, ...]."""
     out = []
-    if results["ids"] and results["ids"][0]:
-        for i, doc_id in enumerate(results["ids"][0]):
+    if results["ids"] and results["ids"][q]:
+        for i, doc_id in enumerate(results["ids"][q]):
             out.append({
                 "id": doc_id,
-                "text": results["documents"][0][i],
-                "metadata": (results["metadatas"][0] or [{}])[i] if results["metadatas"] else {},
-                "distance": results["distances"][0][i] if results.get("distances") else None,
+                "text": results["documents"][q][i],
+                "metadata": (results["metadatas"][q] or [{}])[i] if results["metadatas"] else {},
+                "distance": results["distances"][q][i] if results.get("distances") else None,
             })
     return out
 
@@ -39,6 +57,7 @@ def _tokenize(s: str) -> set:
     return set(re.findall(r"\b\w+\b", (s or "").lower()))
 
 
+@traced("retrieve.keyword")
 def retrieve_keyword(
     query: str,
     top_k: int = TOP_K_RETRIEVAL,
@@ -49,8 +68,7 @@ def retrieve_keyword(
     Keyword: fetch all chunks, score by query-word overlap (count of query words in chunk), return top_k.
     Returns same shape as retrieve() with 'score' instead of 'distance' (higher = better).
     """
-    client = chromadb.PersistentClient(path=persist_dir)
-    col = client.get_collection(collection_name)
+    col = get_collection(collection_name, persist_dir)
     data = col.get(include=["documents", "metadatas"])
     if not data["ids"]:
         return []
@@ -70,9 +88,108 @@ def retrieve_keyword(
     return scored[:top_k]
 
 
+@traced("retrieve.bm25")
+def retrieve_bm25(
+    query: str,
+    top_k: int = TOP_K_RETRIEVAL,
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+) -> list[dict]:
+    """
+    BM25 keyword: score only the chunks that contain query words, using the inverted index
+    written by store_embeddings. Same shape as retrieve_keyword ('distance' = -score).
+    """
+    col = get_collection(collection_name, persist_dir)
+    index = load_index(collection_name, persist_dir)
+    if index is None:
+        # Collection stored before the index existed: build it once from what's stored
+        data = col.get(include=["documents"])
+        save_index(build_index(data["ids"], data["documents"] or []), collection_name, persist_dir)
+        index = load_index(collection_name, persist_dir)
+    hits = bm25_search(index, query, top_k)
+    if not hits:
+        return []
+    data = col.get(ids=[doc_id for doc_id, _ in hits], include=["documents", "metadatas"])
+    by_id = {
+        doc_id: ((data["documents"] or [""])[i] or "", (data["metadatas"][i] or {}) if data.get("metadatas") else {})
+        for i, doc_id in enumerate(data["ids"])
+    }
+    out = []
+    for doc_id, score in hits:
+        if doc_id not in by_id:
+            continue
+        text, metadata = by_id[doc_id]
+        out.append({"id": doc_id, "text": text, "metadata": metadata, "distance": -score})
+    return out
+
+
+# Shared by all sessions, one pool per branch: a slow semantic branch (e.g. model still loading)
+# can't hold up BM25 branches of later queries
+_branch_pools = {
+    "semantic": ThreadPoolExecutor(max_workers=HYBRID_WORKERS, thread_name_prefix="hybrid-semantic"),
+    "keyword": ThreadPoolExecutor(max_workers=HYBRID_WORKERS, thread_name_prefix="hybrid-bm25"),
+}
+
+
+@traced("retrieve.hybrid")
+def retrieve_hybrid(
+    query: str,
+    top_k: int = TOP_K_RETRIEVAL,
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+    model_name: str = EMBEDDING_MODEL,
+    overfetch: int = HYBRID_OVERFETCH,
+    timeout: float = HYBRID_BRANCH_TIMEOUT,
+    rrf_k: int = RRF_K,
+) -> list[dict]:
+    """
+    Hybrid: run semantic and BM25 retrieval concurrently, each over-fetching top_k * overfetch
+    candidates, and merge with reciprocal-rank fusion (score = sum of 1 / (rrf_k + rank)).
+    A branch that errors or misses the timeout is skipped (recorded as a
+    'retrieve.hybrid.skipped.<branch>' metric and listed in each result's 'skipped'); if every
+    branch fails, the first error is raised. A timed-out branch still runs to completion in
+    the background. Same shape as retrieve_keyword ('distance' = -fused score).
+    """
+    n = top_k * overfetch
+    futures = {
+        "semantic": _branch_pools["semantic"].submit(retrieve, query, n, collection_name, persist_dir, model_name),
+        "keyword": _branch_pools["keyword"].submit(retrieve_bm25, query, n, collection_name, persist_dir),
+    }
+    started = time.monotonic()
+    deadline = started + timeout
+    ranked, errors, skipped = {}, [], []
+    for branch, future in futures.items():
+        try:
+            ranked[branch] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except Exception as e:
+            if not isinstance(e, FuturesTimeout):
+                errors.append(e)
+            skipped.append(branch)
+            metrics.observe(f"retrieve.hybrid.skipped.{branch}", time.monotonic() - started, error=True)
+    if not ranked and errors:
+        raise errors[0]
+
+    fused: dict[str, dict] = {}
+    for branch, results in ranked.items():
+        for rank, r in enumerate(results, start=1):
+            entry = fused.setdefault(r["id"], {"id": r["id"], "text": r["text"], "metadata": r["metadata"], "score": 0.0, "branches": []})
+            entry["score"] += 1.0 / (rrf_k + rank)
+            entry["branches"].append(branch)
+    best = sorted(fused.values(), key=lambda e: e["score"], reverse=True)[:top_k]
+    return [
+        {
+            "id": e["id"], "text": e["text"], "metadata": e["metadata"], "distance": -e["score"],
+            "branches": e["branches"], "skipped": skipped,
+        }
+        for e in best
+    ]
+
+
 RETRIEVER_METHODS = {
     "semantic": ("Semantic (SBERT)", retrieve),
     "keyword": ("Keyword overlap", retrieve_keyword),
+    "bm25": ("Keyword BM25 (inverted index)", retrieve_bm25),
+    "hybrid": ("Hybrid (semantic + BM25, RRF)", retrieve_hybrid),
 }
 
 
@@ -82,7 +199,44 @@ def retrieve_with_method(
     top_k: int = TOP_K_RETRIEVAL,
     **kwargs,
 ) -> list[dict]:
-    """Run the selected retriever. method: 'semantic' | 'keyword'."""
+    """Run the selected retriever. method: 'semantic' | 'keyword' | 'bm25' | 'hybrid'."""
     if method == "keyword":
         return retrieve_keyword(query, top_k=top_k, **kwargs)
+    if method == "bm25":
+        return retrieve_bm25(query, top_k=top_k, **kwargs)
+    if method == "hybrid":
+        return retrieve_hybrid(query, top_k=top_k, **kwargs)
     return retrieve(query, top_k=top_k, **kwargs)
+
+
+@traced("retrieve.batch", count=len)
+def retrieve_batch(
+    queries: list[str],
+    method: str = "semantic",
+    top_k: int = TOP_K_RETRIEVAL,
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+    model_name: str = EMBEDDING_MODEL,
+) -> list[list[dict]]:
+    """
+    Run many queries at once. Semantic: one batched model.encode and one multi-embedding
+    col.query. Other methods reuse the loaded collection/index per query.
+    Returns one result list per query, in input order.
+    """
+    if not queries:
+        return []
+    if method in ("keyword", "bm25"):
+        return [
+            retrieve_with_method(q, method=method, top_k=top_k, collection_name=collection_name, persist_dir=persist_dir)
+            for q in queries
+        ]
+    if method == "hybrid":
+        return [
+            retrieve_hybrid(q, top_k=top_k, collection_name=collection_name, persist_dir=persist_dir, model_name=model_name)
+            for q in queries
+        ]
+    col = get_collection(collection_name, persist_dir)
+    model = get_model(model_name)
+    query_embeddings = model.encode(list(queries), show_progress_bar=False).tolist()
+    results = col.query(query_embeddings=query_embeddings, n_results=top_k, include=["documents", "metadatas", "distances"])
+    return [_query_results(results, q) for q in range(len(queries))]
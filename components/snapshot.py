@@ -0,0 +1,281 @@
+"""
+Index snapshots - export a collection (vectors, chunk texts, metadata, BM25 index) to a
+portable directory and load it back without re-embedding, e.g. on Streamlit Cloud where
+chroma_db/ is lost on every restart.
+
+    <snapshot>/manifest.json   format version, model fingerprint, counts
+    <snapshot>/vectors.npy     float16 or float32 matrix (np.load(..., mmap_mode="r"))
+    <snapshot>/chunks.json     ids, documents, metadatas (same row order)
+    <snapshot>/bm25.json       keyword index, if the collection had one
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from config import CHROMA_DIR, COLLECTION_NAME, EMBEDDING_MODEL, VECTOR_STORE_BACKEND, STORE_BATCH_SIZE
+
+FORMAT = "rag-snapshot"
+FORMAT_VERSION = 1
+# Embedded at export and (optionally) re-embedded at import: a changed model gives a different vector
+PROBE_TEXT = "The quick brown fox jumps over the lazy dog."
+PROBE_MIN_SIMILARITY = 0.99
+_MANIFEST_KEYS = ("snapshot_id", "collection", "count", "sources", "model")
+_MODEL_KEYS = ("name", "dim", "probe")
+
+_lock = threading.Lock()
+# (abs snapshot path, abs persist_dir) -> load state (see load_async), so each process loads a snapshot once
+_loaded: dict[tuple, dict] = {}
+_threads: dict[tuple, threading.Thread] = {}
+
+
+class SnapshotError(ValueError):
+    """Snapshot missing, malformed, or built with another format version / embedding model."""
+
+
+def model_fingerprint(model_name: str = EMBEDDING_MODEL) -> dict:
+    """{'name', 'dim', 'probe'}: the model's embedding of PROBE_TEXT identifies its weights."""
+    from components.embedding import encode_texts
+
+    probe = encode_texts([PROBE_TEXT], model_name, use_cache=False)[0]
+    return {"name": model_name, "dim": int(len(probe)), "probe": [round(float(x), 6) for x in probe]}
+
+
+def export_snapshot(
+    out_dir: str,
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+    model_name: str = EMBEDDING_MODEL,
+    dtype: str = "float16",
+    backend: str = VECTOR_STORE_BACKEND,
+) -> dict:
+    """Write the collection to out_dir (replaced if present). Returns the manifest."""
+    from components.storage import get_collection
+    from components.keyword_index import index_path
+
+    if dtype not in ("float16", "float32"):
+        raise ValueError("dtype must be float16 or float32")
+    col = get_collection(collection_name, persist_dir, backend)
+    data = col.get(include=["embeddings", "documents", "metadatas"])
+    vectors = np.asarray(data["embeddings"] if data["embeddings"] is not None else [], dtype=np.float32)
+    fingerprint = model_fingerprint(model_name)
+    if len(vectors) and vectors.shape[1] != fingerprint["dim"]:
+        raise SnapshotError(f"Collection vectors have {vectors.shape[1]} dimensions, {model_name} gives {fingerprint['dim']}")
+
+    tmp = out_dir.rstrip("/\\") + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "vectors.npy"), vectors.astype(dtype))
+    chunks = {"ids": data["ids"], "documents": data["documents"], "metadatas": data["metadatas"]}
+    with open(os.path.join(tmp, "chunks.json"), "w", encoding="utf-8") as f:
+        json.dump(chunks, f, ensure_ascii=False)
+    bm25 = index_path(collection_name, persist_dir)
+    if os.path.exists(bm25):
+        shutil.copyfile(bm25, os.path.join(tmp, "bm25.json"))
+
+    digest = hashlib.sha1()
+    for name in ("vectors.npy", "chunks.json"):
+        with open(os.path.join(tmp, name), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    manifest = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "snapshot_id": digest.hexdigest()[:16],
+        "collection": collection_name,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "count": len(data["ids"]),
+        "dtype": dtype,
+        "sources": sorted({(m or {}).get("source", "") for m in data["metadatas"] or []} - {""}),
+        "model": fingerprint,
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp, out_dir)
+    return manifest
+
+
+def read_manifest(snapshot_dir: str, model_name: str = EMBEDDING_MODEL) -> dict:
+    """Manifest of a usable snapshot; raises SnapshotError if it can't be used with model_name."""
+    try:
+        with open(os.path.join(snapshot_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"No readable snapshot at {snapshot_dir}: {e}")
+    if manifest.get("format") != FORMAT or manifest.get("version") != FORMAT_VERSION:
+        raise SnapshotError(
+            f"Snapshot format {manifest.get('format')} v{manifest.get('version')} is not {FORMAT} v{FORMAT_VERSION}; re-export it"
+        )
+    model = manifest.get("model") if isinstance(manifest.get("model"), dict) else {}
+    missing = [k for k in _MANIFEST_KEYS if k not in manifest] + [f"model.{k}" for k in _MODEL_KEYS if k not in model]
+    if missing:
+        raise SnapshotError(f"Snapshot manifest at {snapshot_dir} lacks {', '.join(missing)}; re-export it")
+    if manifest["model"]["name"] != model_name:
+        raise SnapshotError(f"Snapshot was embedded with {manifest['model']['name']}, the app uses {model_name}")
+    return manifest
+
+
+def verify_model(manifest: dict, model_name: str = EMBEDDING_MODEL) -> None:
+    """Raise SnapshotError if the local model embeds the probe differently (other weights/version)."""
+    now = np.asarray(model_fingerprint(model_name)["probe"], dtype=np.float32)
+    then = np.asarray(manifest["model"]["probe"], dtype=np.float32)
+    if now.shape != then.shape:
+        raise SnapshotError(f"Model dimension changed: snapshot {then.shape[0]}, local {now.shape[0]}")
+    similarity = float(now @ then / ((np.linalg.norm(now) * np.linalg.norm(then)) or 1.0))
+    if similarity < PROBE_MIN_SIMILARITY:
+        raise SnapshotError(f"Local {model_name} differs from the one used for the snapshot (probe similarity {similarity:.3f})")
+
+
+def import_snapshot(
+    snapshot_dir: str,
+    persist_dir: str = CHROMA_DIR,
+    collection_name: Optional[str] = None,
+    model_name: str = EMBEDDING_MODEL,
+    check_model: bool = False,
+    backend: str = VECTOR_STORE_BACKEND,
+) -> dict:
+    """
+    Replace the collection (default: the exported one's name) with the snapshot. With the
+    numpy backend this just writes the matrix and metadata files; ChromaDB re-inserts the
+    vectors (no re-embedding either way). check_model also re-embeds the probe text.
+    Returns {'collection', 'count', 'seconds', 'manifest'}.
+    """
+    from components.storage import delete_collection, get_or_create_collection, invalidate_collection
+    from components.keyword_index import delete_index, save_index
+    from components.vector_store import write_numpy_collection
+
+    start = time.perf_counter()
+    manifest = read_manifest(snapshot_dir, model_name)
+    if check_model:
+        verify_model(manifest, model_name)
+    name = collection_name or manifest["collection"]
+    # Read everything before the existing collection is deleted
+    bm25 = os.path.join(snapshot_dir, "bm25.json")
+    try:
+        vectors = np.load(os.path.join(snapshot_dir, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(snapshot_dir, "chunks.json"), encoding="utf-8") as f:
+            chunks = json.load(f)
+        chunks = {k: chunks[k] for k in ("ids", "documents", "metadatas")}
+        keyword_index = None
+        if os.path.exists(bm25):
+            with open(bm25, encoding="utf-8") as f:
+                keyword_index = json.load(f)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise SnapshotError(f"Snapshot at {snapshot_dir} is incomplete or unreadable: {type(e).__name__}: {e}")
+    if len(vectors) != len(chunks["ids"]):
+        raise SnapshotError(f"Snapshot is inconsistent: {len(vectors)} vectors for {len(chunks['ids'])} chunks")
+
+    delete_collection(name, persist_dir, backend=backend)
+    if backend == "numpy":
+        write_numpy_collection(name, persist_dir, chunks["ids"], vectors, chunks["documents"], chunks["metadatas"])
+        invalidate_collection(name, persist_dir)
+    else:
+        col = get_or_create_collection(name, persist_dir, backend=backend)
+        for i in range(0, len(chunks["ids"]), STORE_BATCH_SIZE):
+            col.add(
+                ids=chunks["ids"][i:i + STORE_BATCH_SIZE],
+                embeddings=np.asarray(vectors[i:i + STORE_BATCH_SIZE], dtype=np.float32),
+                documents=chunks["documents"][i:i + STORE_BATCH_SIZE],
+                metadatas=chunks["metadatas"][i:i + STORE_BATCH_SIZE],
+            )
+
+    if keyword_index is not None:
+        save_index(keyword_index, name, persist_dir)
+    else:
+        delete_index(name, persist_dir)
+    return {"collection": name, "count": len(chunks["ids"]), "seconds": round(time.perf_counter() - start, 3), "manifest": manifest}
+
+
+def _load(state: dict, snapshot_dir: str, persist_dir: str, model_name: str) -> None:
+    """Thread body of load_async: import unless the same snapshot is already in persist_dir."""
+    from components import namespaces
+
+    start = time.perf_counter()
+    try:
+        manifest = read_manifest(snapshot_dir, model_name)
+        entry = namespaces.info(manifest["collection"], persist_dir)
+        if entry and entry.get("snapshot_id") == manifest["snapshot_id"]:
+            result = {"collection": manifest["collection"], "count": manifest["count"], "manifest": manifest, "imported": False}
+        else:
+            result = {**import_snapshot(snapshot_dir, persist_dir, model_name=model_name), "imported": True}
+            size_bytes = os.path.getsize(os.path.join(snapshot_dir, "vectors.npy")) + os.path.getsize(
+                os.path.join(snapshot_dir, "chunks.json")
+            )
+            namespaces.register(
+                result["collection"], ", ".join(manifest["sources"]) or "snapshot", result["count"], size_bytes,
+                persist_dir, pinned=True, snapshot_id=manifest["snapshot_id"],
+            )
+    except Exception as e:
+        with _lock:
+            state.update({"status": "failed", "error": str(e) if isinstance(e, SnapshotError) else repr(e)})
+        return
+    with _lock:
+        state.update({**result, "seconds": round(time.perf_counter() - start, 3), "status": "loaded"})
+
+
+def load_async(snapshot_dir: str, persist_dir: str = CHROMA_DIR, model_name: str = EMBEDDING_MODEL) -> dict:
+    """
+    Load snapshot_dir in a daemon thread, started once per process; later calls return the
+    same state dict. Its 'status' is 'loading', then 'loaded' (with 'collection', 'count',
+    'manifest', 'imported', 'seconds') or 'failed' ('error'). ChromaDB rebuilds the HNSW
+    index on import, so the app calls this rather than blocking its first render.
+    """
+    key = (os.path.abspath(snapshot_dir), os.path.abspath(persist_dir))
+    with _lock:
+        if key not in _loaded:
+            state = _loaded[key] = {"status": "loading"}
+            _threads[key] = threading.Thread(
+                target=_load, args=(state, snapshot_dir, persist_dir, model_name), name="snapshot-load", daemon=True,
+            )
+            _threads[key].start()
+        return _loaded[key]
+
+
+def ensure_loaded(snapshot_dir: str, persist_dir: str = CHROMA_DIR, model_name: str = EMBEDDING_MODEL) -> dict:
+    """
+    load_async() and wait for it: import snapshot_dir once per process (skipped if the same
+    snapshot is already in persist_dir) and register its collection as pinned. Raises
+    SnapshotError if stale or unreadable. Only the model name is checked here;
+    verify_loaded() checks the weights once the model is loaded.
+    """
+    state = load_async(snapshot_dir, persist_dir, model_name)
+    _threads[(os.path.abspath(snapshot_dir), os.path.abspath(persist_dir))].join()
+    if state["status"] == "failed":
+        raise SnapshotError(state["error"])
+    return state
+
+
+def verify_loaded(snapshot_dir: str, persist_dir: str = CHROMA_DIR, model_name: str = EMBEDDING_MODEL) -> None:
+    """
+    verify_model() for a snapshot load_async() has started in this process, once it has
+    loaded (no-op if it wasn't started or failed). If the local model differs, its collection
+    is dropped and the state becomes 'dropped' with the reason in 'error'. Meant for the
+    background warm-up, after the model loads.
+    """
+    from components import namespaces
+
+    key = (os.path.abspath(snapshot_dir), os.path.abspath(persist_dir))
+    with _lock:
+        thread = _threads.get(key)
+    if thread is None:
+        return
+    thread.join()
+    state = _loaded[key]
+    if state["status"] != "loaded" or "verified" in state:
+        return
+    try:
+        verify_model(state["manifest"], model_name)
+    except SnapshotError as e:
+        namespaces.drop(state["collection"], persist_dir)
+        with _lock:
+            state.update({"status": "dropped", "error": str(e), "verified": False})
+    else:
+        with _lock:
+            state["verified"] = True
@@ -1,46 +1,317 @@
-"""Step 5: Storage - persist embeddings in local ChromaDB."""
-import chromadb
+"""Step 5: Storage - persist embeddings in the vector store (ChromaDB by default)."""
+import hashlib
+import os
+import sys
+import threading
+from collections import Counter
+import numpy as np
 from typing import Optional
 
-from config import CHROMA_DIR, COLLECTION_NAME
+from config import (
+    CHROMA_DIR,
+    COLLECTION_NAME,
+    VECTOR_STORE_BACKEND,
+    STORE_BATCH_SIZE,
+    HNSW_SPACE,
+    HNSW_M,
+    HNSW_CONSTRUCTION_EF,
+    HNSW_SEARCH_EF,
+)
+from components.keyword_index import build_index, save_index, delete_index
+from components.vector_store import open_numpy_collection, delete_numpy_collection
+from components import answer_cache
+from components.metrics import traced
+
+# Pooled handles shared by all sessions: persist_dir -> client,
+# (backend, persist_dir, name) -> collection
+_pool_lock = threading.RLock()
+_clients: dict = {}
+_collections: dict = {}
+
+
+def _dir_key(persist_dir: str) -> str:
+    return os.path.abspath(persist_dir)
 
 
 def get_client(persist_dir: str = CHROMA_DIR):
-    """Get or create ChromaDB client with persistent storage."""
-    return chromadb.PersistentClient(path=persist_dir)
+    """Get the pooled ChromaDB client for persist_dir (created on first use)."""
+    key = _dir_key(persist_dir)
+    with _pool_lock:
+        client = _clients.get(key)
+        if client is None:
+            import chromadb  # heavy; only the chroma backend needs it
+
+            client = chromadb.PersistentClient(path=persist_dir)
+            _clients[key] = client
+        return client
+
+
+HNSW_KEYS = ("space", "M", "construction_ef", "search_ef")
+
+
+def hnsw_metadata(hnsw: Optional[dict] = None) -> dict:
+    """
+    ChromaDB collection metadata for an HNSW index. hnsw overrides any of HNSW_KEYS; the rest
+    come from config.py. Only used when a collection is created.
+    """
+    params = {"space": HNSW_SPACE, "M": HNSW_M, "construction_ef": HNSW_CONSTRUCTION_EF, "search_ef": HNSW_SEARCH_EF}
+    unknown = set(hnsw or {}) - set(HNSW_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown HNSW parameter(s): {', '.join(sorted(unknown))}")
+    params.update(hnsw or {})
+    return {"description": "RAG demo", **{f"hnsw:{k}": v for k, v in params.items()}}
+
+
+def _open_collection(collection_name: str, persist_dir: str, backend: str, create: bool, hnsw: Optional[dict] = None):
+    if backend == "numpy":
+        return open_numpy_collection(collection_name, persist_dir, create=create)
+    client = get_client(persist_dir)
+    if create:
+        return client.get_or_create_collection(name=collection_name, metadata=hnsw_metadata(hnsw))
+    return client.get_collection(collection_name)
+
+
+def get_collection(
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+    backend: str = VECTOR_STORE_BACKEND,
+):
+    """
+    Get a pooled handle for an existing collection. Raises if the collection doesn't exist
+    (same as client.get_collection).
+    """
+    key = (backend, _dir_key(persist_dir), collection_name)
+    with _pool_lock:
+        col = _collections.get(key)
+        if col is None:
+            col = _open_collection(collection_name, persist_dir, backend, create=False)
+            _collections[key] = col
+        return col
 
 
-def create_or_reset_collection(client, collection_name: str = COLLECTION_NAME):
-    """Create a new collection (or get existing and clear for demo)."""
+def warm_up(
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+    backend: str = VECTOR_STORE_BACKEND,
+) -> None:
+    """Import the backend and open the collection if it exists, so the first query doesn't pay for it."""
     try:
-        col = client.get_collection(collection_name)
-        client.delete_collection(collection_name)
+        get_collection(collection_name, persist_dir, backend)
     except Exception:
-        pass
-    return client.create_collection(name=collection_name, metadata={"description": "RAG demo"})
+        pass  # not created yet; the client is open anyway
+
+
+def invalidate_collection(collection_name: str = COLLECTION_NAME, persist_dir: Optional[str] = None) -> None:
+    """Forget pooled handles for a collection (all backends; all persist dirs if persist_dir is None)."""
+    with _pool_lock:
+        for key in list(_collections):
+            if key[2] == collection_name and (persist_dir is None or key[1] == _dir_key(persist_dir)):
+                del _collections[key]
+
+
+def reset_client(persist_dir: str = CHROMA_DIR) -> None:
+    """
+    Drop the pooled ChromaDB client and handles for persist_dir and chromadb's own client
+    cache, so collections are reloaded from disk on next use. Only for tools: other threads
+    must not be using ChromaDB at the time.
+    """
+    key = _dir_key(persist_dir)
+    with _pool_lock:
+        _clients.pop(key, None)
+        for k in [k for k in _collections if k[0] == "chroma" and k[1] == key]:
+            del _collections[k]
+        if "chromadb" in sys.modules:
+            from chromadb.api.client import SharedSystemClient
+
+            SharedSystemClient.clear_system_cache()
+
+
+def get_or_create_collection(
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+    backend: str = VECTOR_STORE_BACKEND,
+    hnsw: Optional[dict] = None,
+):
+    """
+    Get a pooled handle, creating the collection if it doesn't exist yet (with the HNSW
+    settings from hnsw_metadata; an existing collection keeps the ones it was created with).
+    """
+    key = (backend, _dir_key(persist_dir), collection_name)
+    with _pool_lock:
+        col = _collections.get(key)
+        if col is None:
+            col = _open_collection(collection_name, persist_dir, backend, create=True, hnsw=hnsw)
+            _collections[key] = col
+        return col
+
+
+def delete_collection(
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+    backend: str = VECTOR_STORE_BACKEND,
+) -> None:
+    """Drop a collection (no error if it doesn't exist), its keyword index and its pooled handle."""
+    with _pool_lock:
+        invalidate_collection(collection_name, persist_dir)
+        answer_cache.invalidate(collection_name)
+        delete_index(collection_name, persist_dir)
+        if backend == "numpy":
+            delete_numpy_collection(collection_name, persist_dir)
+            return
+        try:
+            get_client(persist_dir).delete_collection(collection_name)
+        except Exception:
+            pass
+
+
+def create_or_reset_collection(client, collection_name: str = COLLECTION_NAME, hnsw: Optional[dict] = None):
+    """Create a new ChromaDB collection (or get existing and clear for demo) with these HNSW settings."""
+    with _pool_lock:
+        dir_key = next((k for k, c in _clients.items() if c is client), None)
+        invalidate_collection(collection_name, dir_key)
+        answer_cache.invalidate(collection_name)
+        try:
+            client.get_collection(collection_name)
+            client.delete_collection(collection_name)
+        except Exception:
+            pass
+        col = client.create_collection(name=collection_name, metadata=hnsw_metadata(hnsw))
+        if dir_key is not None:
+            _collections[("chroma", dir_key, collection_name)] = col
+        return col
+
+
+def set_search_ef(col, search_ef: int) -> None:
+    """
+    Set how many candidates the collection's HNSW index examines per query. An admin call
+    (benchmarks.hnsw_tuning --apply), never made on the query path: the value is persisted and
+    shared by everyone using the collection. No-op if unchanged or for the numpy backend.
+    chromadb >= 1.0 applies it when the index is next loaded: right away if this process
+    hasn't queried the collection yet, otherwise after a restart (or reset_client).
+    """
+    if not hasattr(col, "modify"):
+        return
+    with _pool_lock:
+        current = ((getattr(col, "configuration", None) or {}).get("hnsw") or {}).get("ef_search")
+        if current is None:
+            current = (col.metadata or {}).get("hnsw:search_ef")
+        if current == search_ef:
+            return
+        try:
+            col.modify(configuration={"hnsw": {"ef_search": search_ef}})
+        except TypeError:  # chromadb < 1.0: HNSW settings live in the metadata
+            col.modify(metadata={**(col.metadata or {}), "hnsw:search_ef": search_ef})
+
+
+def chunk_id(text: str, source: str = "", occurrence: int = 0) -> str:
+    """
+    Content-addressed chunk ID: hash of source document + chunk text. occurrence numbers
+    repeated identical chunks within one document so their IDs stay unique and stable.
+    """
+    digest = hashlib.sha1(f"{source}\x00{occurrence}\x00{text}".encode("utf-8")).hexdigest()[:20]
+    return f"chunk_{digest}"
+
+
+def assign_chunk_ids(chunks: list[dict], source: str = "") -> list[str]:
+    """chunk_id for each chunk in order (works for chunk or embedding dicts)."""
+    seen = Counter()
+    ids = []
+    for c in chunks:
+        ids.append(chunk_id(c["text"], source, seen[c["text"]]))
+        seen[c["text"]] += 1
+    return ids
+
+
+def chunk_metadata(chunk: dict, source: str = "") -> dict:
+    """Metadata stored with each chunk: source document, position and (if known) page."""
+    meta = {"source": source, "chunk_index": chunk["index"]}
+    if chunk.get("page"):
+        meta["page"] = chunk["page"]
+    return meta
+
+
+def rebuild_keyword_index(col, collection_name: str = COLLECTION_NAME, persist_dir: str = CHROMA_DIR) -> None:
+    """Rewrite the BM25 index from everything currently in the collection."""
+    data = col.get(include=["documents"])
+    save_index(build_index(data["ids"], data["documents"] or []), collection_name, persist_dir)
+
+
+@traced("store", count=lambda r: r["added"] + r["kept"])
+def sync_embeddings(
+    embeddings: list[dict],
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+    source: str = "",
+    only_source: bool = False,
+    rebuild_index: bool = True,
+    batch_size: int = STORE_BATCH_SIZE,
+    hnsw: Optional[dict] = None,
+) -> dict:
+    """
+    Make the collection match these embeddings without re-writing unchanged chunks.
+    Chunks already stored (same content-addressed ID) are kept, new ones are added and
+    stored chunks that are no longer present are deleted. By default the whole collection
+    is diffed (single-PDF app); with only_source=True only chunks from `source` are touched.
+    New chunks are added batch_size at a time. Pass rebuild_index=False when storing many
+    documents in a row and call rebuild_keyword_index once at the end. hnsw: index settings
+    if the collection is created here (see hnsw_metadata).
+    Returns {'added', 'kept', 'deleted', 'stored'}.
+    """
+    col = get_or_create_collection(collection_name, persist_dir, hnsw=hnsw)
+    ids = assign_chunk_ids(embeddings, source)
+    metadatas = [chunk_metadata(e, source) for e in embeddings]
+
+    existing = col.get(where={"source": source} if only_source else None, include=["metadatas"])
+    old_meta = {
+        id_: (meta or {})
+        for id_, meta in zip(existing["ids"], existing.get("metadatas") or [None] * len(existing["ids"]))
+    }
+    new_ids = set(ids)
+    to_delete = [id_ for id_ in old_meta if id_ not in new_ids]
+    add_pos = [i for i, id_ in enumerate(ids) if id_ not in old_meta]
+    # Kept chunks may have moved (e.g. text inserted earlier in the PDF): refresh positions only
+    moved = [i for i, id_ in enumerate(ids) if id_ in old_meta and old_meta[id_] != metadatas[i]]
+
+    if to_delete:
+        col.delete(ids=to_delete)
+    for start in range(0, len(add_pos), batch_size):
+        batch = add_pos[start:start + batch_size]
+        col.add(
+            ids=[ids[i] for i in batch],
+            documents=[embeddings[i]["text"] for i in batch],
+            embeddings=np.asarray([embeddings[i]["embedding"] for i in batch], dtype=np.float32),
+            metadatas=[metadatas[i] for i in batch],
+        )
+    if moved:
+        col.update(ids=[ids[i] for i in moved], metadatas=[metadatas[i] for i in moved])
+    if to_delete or add_pos:
+        if rebuild_index:
+            rebuild_keyword_index(col, collection_name, persist_dir)
+        answer_cache.invalidate(collection_name)
+    return {
+        "added": len(add_pos),
+        "kept": len(ids) - len(add_pos),
+        "deleted": len(to_delete),
+        "stored": len(ids),
+    }
 
 
 def store_embeddings(
     embeddings: list[dict],
     collection_name: str = COLLECTION_NAME,
     persist_dir: str = CHROMA_DIR,
+    source: str = "",
+    hnsw: Optional[dict] = None,
 ) -> int:
     """
-    Store chunk embeddings in ChromaDB. IDs are chunk_0, chunk_1, ...
+    Store chunk embeddings in the vector store under content-addressed IDs (see chunk_id), only
+    writing what changed since the last store. Also keeps the BM25 keyword index in sync.
+    hnsw overrides config.py's HNSW settings for a new collection (see hnsw_metadata).
     Returns number of documents stored.
     """
     if not embeddings:
         return 0
-
-    client = get_client(persist_dir)
-    col = create_or_reset_collection(client, collection_name)
-
-    ids = [f"chunk_{e['index']}" for e in embeddings]
-    documents = [e["text"] for e in embeddings]
-    vectors = [e["embedding"] for e in embeddings]
-
-    col.add(ids=ids, documents=documents, embeddings=vectors)
-    return len(ids)
+    return sync_embeddings(embeddings, collection_name, persist_dir, source=source, hnsw=hnsw)["stored"]
 
 
 def get_stored_content(
@@ -53,8 +324,7 @@ def get_stored_content(
     doesn't exist or is empty; otherwise dict with count and list of {id, text_preview}.
     """
     try:
-        client = get_client(persist_dir)
-        col = client.get_collection(collection_name)
+        col = get_collection(collection_name, persist_dir)
     except Exception:
         return None
     n = col.count()
@@ -0,0 +1,302 @@
+"""
+Vector store backends. storage/retrieval talk to a "collection" with the subset of the
+ChromaDB Collection API the app uses: add, update, delete, get, query, count.
+  - "chroma": a chromadb Collection (HNSW index in sqlite files)
+  - "numpy":  NumpyCollection below - exact search over a normalized float32 matrix
+    memory-mapped from disk, written append-only; good for up to ~100k chunks.
+Select with VECTOR_STORE_BACKEND in config.py.
+"""
+from __future__ import annotations
+import json
+import os
+import shutil
+import threading
+from typing import Optional
+
+import numpy as np
+
+_INCLUDE_DEFAULT = ("metadatas", "documents")
+
+
+def collection_dir(collection_name: str, persist_dir: str) -> str:
+    """Directory holding a NumpyCollection's files."""
+    return os.path.join(persist_dir, "numpy", collection_name)
+
+
+def _matches(metadata: Optional[dict], where: Optional[dict]) -> bool:
+    """Equality filter ({"key": value, ...}), enough for what storage needs."""
+    if not where:
+        return True
+    metadata = metadata or {}
+    return all(metadata.get(k) == v for k, v in where.items())
+
+
+def normalize(vectors) -> np.ndarray:
+    """Rows scaled to unit length (zero rows left as they are), as float32."""
+    arr = np.asarray(vectors, dtype=np.float32)
+    if arr.ndim == 1:
+        arr = arr[None, :]
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+class NumpyCollection:
+    """
+    Exact cosine search. Vectors live in vectors.f32, a raw float32 matrix memory-mapped
+    read/write whose capacity grows by doubling, so add() writes only the new rows. Documents
+    and metadata are in meta.jsonl, an append-only log with one line per add/update/delete
+    call, replayed on open. Deleted rows stay in the file as tombstones until they outnumber
+    the live ones; then both files are rewritten compactly. 'distance' is cosine distance
+    (1 - similarity).
+    """
+
+    _MIN_CAPACITY = 1024
+
+    def __init__(self, name: str, directory: str):
+        self.name = name
+        self._dir = directory
+        self._lock = threading.RLock()
+        self._load()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self._dir, "vectors.f32")
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self._dir, "meta.jsonl")
+
+    def _load(self) -> None:
+        self._ids: list[Optional[str]] = []  # None = deleted row
+        self._documents: list[Optional[str]] = []
+        self._metadatas: list[Optional[dict]] = []
+        self._row: dict[str, int] = {}
+        self._dim: Optional[int] = None
+        with open(self._log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # torn last line from an interrupted write
+                self._apply(entry)
+        self._alive = np.array([id_ is not None for id_ in self._ids], dtype=bool)
+        self._vectors = None
+        if self._dim is not None and os.path.exists(self._vectors_path):
+            self._map()
+
+    def _apply(self, entry: dict) -> None:
+        """Replay one log entry on the in-memory lists."""
+        ids = entry["ids"]
+        if entry["op"] == "add":
+            self._dim = entry.get("dim", self._dim)
+            for n, id_ in enumerate(ids):
+                self._row[id_] = len(self._ids)
+                self._ids.append(id_)
+                self._documents.append(entry["documents"][n] if entry.get("documents") is not None else None)
+                self._metadatas.append(entry["metadatas"][n] if entry.get("metadatas") is not None else None)
+        elif entry["op"] == "update":
+            for n, id_ in enumerate(ids):
+                row = self._row.get(id_)
+                if row is None:
+                    continue
+                if entry.get("documents") is not None:
+                    self._documents[row] = entry["documents"][n]
+                if entry.get("metadatas") is not None:
+                    self._metadatas[row] = entry["metadatas"][n]
+        elif entry["op"] == "delete":
+            for id_ in ids:
+                row = self._row.pop(id_, None)
+                if row is not None:
+                    self._ids[row] = self._documents[row] = self._metadatas[row] = None
+
+    def _log(self, entry: dict) -> None:
+        self._apply(entry)
+        with open(self._log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def _map(self) -> None:
+        rows = os.path.getsize(self._vectors_path) // (4 * self._dim)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(rows, self._dim)) if rows else None
+
+    def _reserve(self, rows: int) -> None:
+        """Grow vectors.f32 (and the alive mask) to hold at least `rows` rows."""
+        capacity = len(self._vectors) if self._vectors is not None else 0
+        if rows > capacity:
+            self._vectors = None  # drop the mapping before resizing the file
+            capacity = max(rows, 2 * capacity, self._MIN_CAPACITY)
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(capacity * self._dim * 4)
+            self._map()
+        if rows > len(self._alive):
+            alive = np.zeros(len(self._vectors), dtype=bool)
+            alive[:len(self._alive)] = self._alive
+            self._alive = alive
+
+    def _compact(self) -> None:
+        """Rewrite both files without deleted rows."""
+        rows = [r for r, id_ in enumerate(self._ids) if id_ is not None]
+        vectors = np.array(self._vectors[rows]) if self._vectors is not None and rows else None
+        ids = [self._ids[r] for r in rows]
+        documents = [self._documents[r] for r in rows]
+        metadatas = [self._metadatas[r] for r in rows]
+        self._vectors = None
+        _write_files(self._dir, ids, vectors, documents, metadatas, self._dim)
+        self._load()
+
+    def count(self) -> int:
+        return len(self._row)
+
+    def add(self, ids, embeddings, documents=None, metadatas=None) -> None:
+        """Append rows; IDs that already exist are ignored (as in ChromaDB)."""
+        with self._lock:
+            keep = [i for i, id_ in enumerate(ids) if id_ not in self._row]
+            if not keep:
+                return
+            new = normalize(embeddings)[keep]
+            if self._dim is None:
+                self._dim = new.shape[1]
+            start = len(self._ids)
+            self._reserve(start + len(new))
+            self._vectors[start:start + len(new)] = new
+            self._vectors.flush()
+            self._alive[start:start + len(new)] = True
+            # Logged after the vectors: rows past the log's end are ignored on open
+            self._log({
+                "op": "add",
+                "dim": self._dim,
+                "ids": [ids[i] for i in keep],
+                "documents": [documents[i] for i in keep] if documents is not None else None,
+                "metadatas": [metadatas[i] for i in keep] if metadatas is not None else None,
+            })
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None) -> None:
+        with self._lock:
+            if embeddings is not None and self._vectors is not None:
+                normalized = normalize(embeddings)
+                for n, id_ in enumerate(ids):
+                    row = self._row.get(id_)
+                    if row is not None:
+                        self._vectors[row] = normalized[n]
+                self._vectors.flush()
+            if documents is not None or metadatas is not None:
+                self._log({"op": "update", "ids": list(ids), "documents": documents, "metadatas": metadatas})
+
+    def delete(self, ids=None, where=None) -> None:
+        with self._lock:
+            drop = {id_ for id_ in (ids or []) if id_ in self._row}
+            if where:
+                drop |= {id_ for id_, m in zip(self._ids, self._metadatas) if id_ is not None and _matches(m, where)}
+            if not drop:
+                return
+            for id_ in drop:
+                self._alive[self._row[id_]] = False
+            self._log({"op": "delete", "ids": sorted(drop)})
+            dead = len(self._ids) - len(self._row)
+            if dead > max(len(self._row), self._MIN_CAPACITY):
+                self._compact()
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=_INCLUDE_DEFAULT) -> dict:
+        with self._lock:
+            if ids is not None:
+                rows = [self._row[id_] for id_ in ids if id_ in self._row]
+            else:
+                rows = [r for r, id_ in enumerate(self._ids) if id_ is not None]
+            rows = [r for r in rows if _matches(self._metadatas[r], where)]
+            rows = rows[offset or 0:]
+            if limit is not None:
+                rows = rows[:limit]
+            return {
+                "ids": [self._ids[r] for r in rows],
+                "documents": [self._documents[r] for r in rows] if "documents" in include else None,
+                "metadatas": [self._metadatas[r] for r in rows] if "metadatas" in include else None,
+                "embeddings": np.array(self._vectors[rows]) if "embeddings" in include and self._vectors is not None else None,
+            }
+
+    def query(self, query_embeddings, n_results: int = 10, where=None, include=("metadatas", "documents", "distances")) -> dict:
+        """One matrix product for all queries, then argpartition top-k per query."""
+        with self._lock:
+            q = normalize(query_embeddings)
+            out = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            if self._vectors is None or not self._row:
+                for key in out:
+                    out[key] = [[] for _ in range(len(q))]
+                return out
+            n = len(self._ids)
+            sims = self._vectors[:n] @ q.T  # (rows, n_queries); rows past n are spare capacity
+            mask = self._alive[:n]
+            if where:
+                mask = mask & np.array([_matches(m, where) for m in self._metadatas])
+            sims[~mask] = -np.inf
+            k = min(n_results, n)
+            for j in range(sims.shape[1]):
+                col = sims[:, j]
+                top = np.argpartition(-col, k - 1)[:k] if k < len(col) else np.arange(len(col))
+                top = top[np.argsort(-col[top])]
+                top = [r for r in top if np.isfinite(col[r])]
+                out["ids"].append([self._ids[r] for r in top])
+                out["documents"].append([self._documents[r] for r in top])
+                out["metadatas"].append([self._metadatas[r] for r in top])
+                out["distances"].append([float(1.0 - col[r]) for r in top])
+            for key in ("documents", "metadatas", "distances"):
+                if key not in include:
+                    out[key] = None
+            return out
+
+
+def _write_files(directory: str, ids, vectors, documents, metadatas, dim: Optional[int]) -> None:
+    """Write a collection's files from scratch (vectors already normalized)."""
+    os.makedirs(directory, exist_ok=True)
+    vectors_path = os.path.join(directory, "vectors.f32")
+    tmp = vectors_path + ".tmp"
+    if vectors is not None and len(vectors):
+        np.ascontiguousarray(vectors, dtype=np.float32).tofile(tmp)
+        os.replace(tmp, vectors_path)
+    elif os.path.exists(vectors_path):
+        os.remove(vectors_path)
+    entry = {"op": "add", "dim": dim, "ids": list(ids), "documents": list(documents), "metadatas": list(metadatas)}
+    tmp = os.path.join(directory, "meta.jsonl.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    os.replace(tmp, os.path.join(directory, "meta.jsonl"))
+
+
+def write_numpy_collection(collection_name: str, persist_dir: str, ids, vectors, documents, metadatas) -> None:
+    """Create (or replace) a collection in one write, e.g. from a snapshot."""
+    vectors = normalize(vectors) if len(vectors) else None
+    _write_files(
+        collection_dir(collection_name, persist_dir), ids, vectors, documents, metadatas,
+        vectors.shape[1] if vectors is not None else None,
+    )
+
+
+def _migrate(directory: str) -> None:
+    """Convert the older vectors.npy + meta.json layout (rewritten on every write)."""
+    with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    old_vectors = os.path.join(directory, "vectors.npy")
+    vectors = np.load(old_vectors) if os.path.exists(old_vectors) else None
+    dim = vectors.shape[1] if vectors is not None else None
+    _write_files(directory, meta["ids"], vectors, meta["documents"], meta["metadatas"], dim)
+    for name in ("meta.json", "vectors.npy"):
+        if os.path.exists(os.path.join(directory, name)):
+            os.remove(os.path.join(directory, name))
+
+
+def open_numpy_collection(collection_name: str, persist_dir: str, create: bool = False) -> NumpyCollection:
+    """Open a NumpyCollection; raises ValueError if it doesn't exist and create is False."""
+    directory = collection_dir(collection_name, persist_dir)
+    log_path = os.path.join(directory, "meta.jsonl")
+    if not os.path.exists(log_path):
+        if os.path.exists(os.path.join(directory, "meta.json")):
+            _migrate(directory)
+        elif not create:
+            raise ValueError(f"Collection {collection_name} does not exist.")
+        else:
+            os.makedirs(directory, exist_ok=True)
+            open(log_path, "w", encoding="utf-8").close()
+    return NumpyCollection(collection_name, directory)
+
+
+def delete_numpy_collection(collection_name: str, persist_dir: str) -> None:
+    shutil.rmtree(collection_dir(collection_name, persist_dir), ignore_errors=True)
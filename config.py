@@ -5,6 +5,9 @@ import os
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
 CHROMA_DIR = os.path.join(os.path.dirname(__file__), "chroma_db")
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", os.path.join(os.path.dirname(__file__), "embedding_cache", "embeddings.sqlite")
+)
 
 # RAG settings (single PDF - keep simple)
 CHUNK_SIZE = 500
@@ -12,9 +15,103 @@ CHUNK_OVERLAP = 50
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 TOP_K_RETRIEVAL = 3
 COLLECTION_NAME = "rag_demo"
+# Vector store: "chroma" (ChromaDB, HNSW) or "numpy" (exact search over a memory-mapped matrix;
+# fastest for a single PDF / a few thousand chunks). Both live under CHROMA_DIR.
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+# ChromaDB HNSW index, applied when a collection is created. space, M (links per node) and
+# construction_ef are fixed from then on; search_ef (candidates examined per query: higher =
+# better recall, slower) can be changed later with: python -m benchmarks.hnsw_tuning --apply.
+# "cosine" suits normalized sentence embeddings like MiniLM (ChromaDB's default is "l2").
+# Tune on your corpus with: python -m benchmarks.hnsw_tuning
+HNSW_SPACE = os.getenv("HNSW_SPACE", "cosine")
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_CONSTRUCTION_EF = int(os.getenv("HNSW_CONSTRUCTION_EF", "100"))
+HNSW_SEARCH_EF = int(os.getenv("HNSW_SEARCH_EF", "100"))
+
+# App collections: one per document + settings, shared by sessions uploading the same PDF.
+# Dropped after COLLECTION_TTL idle seconds, or least recently used first above the caps
+# (count, and estimated size of vectors + text in MB)
+COLLECTION_TTL = int(os.getenv("COLLECTION_TTL", str(24 * 3600)))
+COLLECTIONS_MAX = 50
+COLLECTIONS_MAX_MB = 2048
+
+# Prebuilt index (python snapshot.py export ...) loaded at startup if this directory exists,
+# so a fresh deploy can answer questions without re-embedding. Stale snapshots (other format
+# version or embedding model) are rejected.
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join(os.path.dirname(__file__), "snapshot"))
+
+# PDF extraction: worker processes (1 = single-threaded) and pages per worker task
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "1"))
+PDF_PAGES_PER_TASK = 50
+
+# Near-duplicate chunks (repeated headers/footers/TOCs) dropped before embedding: MinHash over
+# word shingles, chunks at least DEDUP_THRESHOLD similar (estimated Jaccard) to an earlier one
+DEDUP_ENABLED = True
+DEDUP_THRESHOLD = 0.85
+DEDUP_NUM_PERM = 64
+DEDUP_SHINGLE = 3
+
+# Embedding batches: texts sorted by length, batch size picked so batch_size x longest text
+# stays within this many (estimated) tokens
+EMBED_TOKEN_BUDGET = 16384
+EMBED_MAX_BATCH = 256
+
+# Embedding cache (on disk, keyed by model + chunk text hash); least recently used evicted above this size
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "1") != "0"
+EMBEDDING_CACHE_MAX_MB = 256
+
+# Streaming ingestion: chunks per embed/store batch, and max batches/pages queued between stages
+INGEST_BATCH_SIZE = 64
+INGEST_QUEUE_SIZE = 4
+# Vector store writes: max chunks per add() call
+STORE_BATCH_SIZE = 1000
+
+# Embedding model registry: models stay loaded across calls, capped by estimated memory (MB)
+MODEL_CACHE_MAX_MB = int(os.getenv("MODEL_CACHE_MAX_MB", "1024"))
+WARMUP_MODELS = [EMBEDDING_MODEL]
+
+# Background jobs (embed + store from the app): worker threads, finished jobs remembered
+JOB_WORKERS = 1
+JOB_HISTORY = 20
+
+# Streamlit stage cache: results kept per pipeline stage (load, clean, chunk, dedup)
+PIPELINE_CACHE_MAX_ENTRIES = 4
+
+# BM25 keyword retrieval
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Stage metrics (timers/counters per pipeline stage, see components/metrics.py); p50/p95 are
+# computed over the last METRICS_WINDOW calls of each stage. Off = one flag check per call.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_WINDOW = 500
+
+# Generation: max tokens of retrieved context sent to the LLM (overlapping chunks merged first)
+CONTEXT_TOKEN_BUDGET = 1500
+
+# Hybrid retrieval: each branch fetches top_k * HYBRID_OVERFETCH candidates; a branch slower than
+# HYBRID_BRANCH_TIMEOUT seconds is left out; results merged by reciprocal-rank fusion (RRF_K)
+HYBRID_OVERFETCH = 3
+HYBRID_BRANCH_TIMEOUT = 5.0
+# Threads per hybrid branch (semantic / BM25, separate pools): about the number of concurrent
+# hybrid queries expected, since a timed-out branch keeps its thread until it finishes
+HYBRID_WORKERS = int(os.getenv("HYBRID_WORKERS", "8"))
+RRF_K = 60
 
 # Azure OpenAI – set in .env (local) or Streamlit Secrets (Cloud). No keys in repo.
 AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
 AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2025-01-01-preview")
+# Answer cache: reuse an LLM answer when the retrieved context is identical and the question
+# embedding is at least this cosine-similar to an earlier one; entries expire after TTL seconds
+ANSWER_CACHE_SIMILARITY = 0.92
+ANSWER_CACHE_TTL = 3600
+ANSWER_CACHE_MAX_ENTRIES = 256
+# Client behaviour: request timeout (s), retries on 429/timeouts/5xx with jittered exponential
+# backoff (base/max seconds), and max concurrent calls for the async client
+AZURE_OPENAI_TIMEOUT = float(os.getenv("AZURE_OPENAI_TIMEOUT", "60"))
+AZURE_OPENAI_MAX_RETRIES = 4
+AZURE_OPENAI_BACKOFF_BASE = 0.5
+AZURE_OPENAI_BACKOFF_MAX = 8.0
+AZURE_OPENAI_MAX_CONCURRENCY = 8
@@ -0,0 +1,254 @@
+"""
+Headless ingestion: index every PDF in a directory into one collection.
+Run from project root, e.g.:
+    python ingest.py data/ --workers 4
+    python ingest.py data/ --recursive --collection reports --prune
+Documents are processed in parallel (load_pdf -> clean -> chunk -> embed, one process per
+document); the main process is the only writer to the vector store. A manifest of file hashes
+next to the collection makes re-runs skip unchanged files, so an interrupted run resumes.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from config import (
+    CHROMA_DIR,
+    COLLECTION_NAME,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    EMBEDDING_MODEL,
+    DEDUP_ENABLED,
+    DEDUP_THRESHOLD,
+)
+from components.chunking import CHUNKING_METHODS
+
+MANIFEST_VERSION = 1
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def find_pdfs(root: str, recursive: bool = False) -> list[str]:
+    """PDF paths under root (sorted), or [root] if it is a file."""
+    if os.path.isfile(root):
+        return [root]
+    if not recursive:
+        return sorted(
+            os.path.join(root, name) for name in os.listdir(root)
+            if name.lower().endswith(".pdf") and os.path.isfile(os.path.join(root, name))
+        )
+    found = []
+    for dirpath, _, names in os.walk(root):
+        found.extend(os.path.join(dirpath, n) for n in names if n.lower().endswith(".pdf"))
+    return sorted(found)
+
+
+def source_name(path: str, root: str) -> str:
+    """Source stored with each chunk: the path relative to root (file name if root is a file)."""
+    if os.path.isdir(root):
+        return os.path.relpath(path, root).replace(os.sep, "/")
+    return os.path.basename(path)
+
+
+def manifest_path(collection_name: str, persist_dir: str) -> str:
+    return os.path.join(persist_dir, f"{collection_name}.manifest.json")
+
+
+def load_manifest(path: str, settings: dict) -> dict:
+    """Manifest for these settings; a missing, old or differently configured one starts empty."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if not manifest or manifest.get("version") != MANIFEST_VERSION or manifest.get("settings") != settings:
+        return {"version": MANIFEST_VERSION, "settings": settings, "files": {}}
+    return manifest
+
+
+def save_manifest(manifest: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def process_document(path: str, settings: dict) -> dict:
+    """Worker: PDF -> embedded chunks (everything except the store)."""
+    from components.data_collection import load_pdf
+    from components.cleaning import clean_pages
+    from components.chunking import chunk_table
+    from components.dedup import dedup_chunks
+    from components.embedding import embed_chunks
+
+    start = time.perf_counter()
+    collected = load_pdf(path, workers=1)
+    cleaned = clean_pages(collected["pages"])
+    chunks = chunk_table(
+        cleaned["text"], method=settings["chunking_method"], chunk_size=settings["chunk_size"],
+        overlap=settings["overlap"], page_starts=cleaned["page_starts"],
+    )
+    duplicates = 0
+    if settings["dedup_threshold"]:
+        deduped = dedup_chunks(chunks, settings["dedup_threshold"])
+        chunks, duplicates = chunks.select(deduped["kept"]), deduped["dropped"]
+    return {
+        "pages": collected["metadata"]["num_pages"],
+        "duplicates": duplicates,
+        "embeddings": embed_chunks(chunks, model_name=settings["model"]),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def run(
+    paths: list[str],
+    root: str,
+    settings: dict,
+    collection_name: str = COLLECTION_NAME,
+    persist_dir: str = CHROMA_DIR,
+    workers: int = 2,
+    force: bool = False,
+    prune: bool = False,
+) -> dict:
+    """
+    Index paths (sources are their paths relative to root). Returns counts:
+    {'indexed', 'skipped', 'failed', 'pruned', 'chunks_added', 'chunks_deleted', 'seconds'}.
+    """
+    from components.storage import get_or_create_collection, sync_embeddings, rebuild_keyword_index
+    from components.keyword_index import index_path
+
+    started = time.perf_counter()
+    mpath = manifest_path(collection_name, persist_dir)
+    manifest = load_manifest(mpath, settings)
+    files = manifest["files"]
+    col = get_or_create_collection(collection_name, persist_dir)
+    totals = {"indexed": 0, "skipped": 0, "failed": 0, "pruned": 0, "chunks_added": 0, "chunks_deleted": 0}
+
+    todo = []
+    for path in paths:
+        source = source_name(path, root)
+        digest = file_hash(path)
+        if not force and files.get(source, {}).get("sha256") == digest:
+            totals["skipped"] += 1
+            continue
+        todo.append((path, source, digest))
+
+    if prune:
+        present = {source_name(p, root) for p in paths}
+        for source in [s for s in files if s not in present]:
+            stale = col.get(where={"source": source}, include=[])["ids"]
+            if stale:
+                col.delete(ids=stale)
+            del files[source]
+            totals["pruned"] += 1
+            totals["chunks_deleted"] += len(stale)
+            manifest["keyword_index_stale"] = True
+        save_manifest(manifest, mpath)
+
+    print(f"{len(todo)} to index, {totals['skipped']} unchanged.", file=sys.stderr)
+    # spawn: workers load their own embedding model; forking a parent with torch threads can hang
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        queued = iter(todo)
+        while True:
+            # Keep a couple of documents per worker in flight; finished results wait for the writer
+            while len(pending) < workers * 2:
+                item = next(queued, None)
+                if item is None:
+                    break
+                pending.append((item, pool.submit(process_document, item[0], settings)))
+            if not pending:
+                break
+            (path, source, digest), future = pending.popleft()
+            try:
+                result = future.result()
+                sync = sync_embeddings(
+                    result["embeddings"], collection_name, persist_dir,
+                    source=source, only_source=True, rebuild_index=False,
+                )
+            except Exception as e:
+                totals["failed"] += 1
+                print(f"  FAILED {source}: {e}", file=sys.stderr)
+                continue
+            if sync["added"] or sync["deleted"]:
+                # BM25 index is rebuilt once at the end; remembered in case this run is interrupted
+                manifest["keyword_index_stale"] = True
+            files[source] = {
+                "sha256": digest,
+                "pages": result["pages"],
+                "chunks": sync["stored"],
+                "duplicates": result["duplicates"],
+                "indexed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            save_manifest(manifest, mpath)
+            totals["indexed"] += 1
+            totals["chunks_added"] += sync["added"]
+            totals["chunks_deleted"] += sync["deleted"]
+            print(
+                f"  {source}: {result['pages']} pages, {sync['stored']} chunks "
+                f"(+{sync['added']} / -{sync['deleted']}) in {result['seconds']:.1f}s",
+                file=sys.stderr,
+            )
+
+    if manifest.get("keyword_index_stale") or not os.path.exists(index_path(collection_name, persist_dir)):
+        rebuild_keyword_index(col, collection_name, persist_dir)
+        manifest["keyword_index_stale"] = False
+        save_manifest(manifest, mpath)
+    return {**totals, "seconds": round(time.perf_counter() - started, 1)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Index a directory of PDFs into the vector store.")
+    parser.add_argument("path", help="Directory of PDFs (or a single PDF)")
+    parser.add_argument("--recursive", action="store_true", help="Include PDFs in subdirectories")
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--persist-dir", default=CHROMA_DIR)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Document worker processes")
+    parser.add_argument("--chunking-method", default="fixed", choices=list(CHUNKING_METHODS.keys()))
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--overlap", type=int, default=CHUNK_OVERLAP)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD if DEDUP_ENABLED else 0,
+                        help="Drop near-duplicate chunks at this similarity (0 = off)")
+    parser.add_argument("--force", action="store_true", help="Re-process files even if unchanged")
+    parser.add_argument("--prune", action="store_true", help="Remove chunks of indexed files that are gone")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"Not found: {args.path}", file=sys.stderr)
+        return 2
+    settings = {
+        "chunking_method": args.chunking_method,
+        "chunk_size": args.chunk_size,
+        "overlap": args.overlap,
+        "model": args.model,
+        "dedup_threshold": args.dedup_threshold or None,
+    }
+    paths = find_pdfs(args.path, args.recursive)
+    totals = run(
+        paths, args.path, settings, args.collection, args.persist_dir,
+        workers=max(1, args.workers), force=args.force, prune=args.prune,
+    )
+    print(
+        f"Indexed {totals['indexed']}, skipped {totals['skipped']} unchanged, failed {totals['failed']}, "
+        f"pruned {totals['pruned']} ({totals['chunks_added']} chunks added, {totals['chunks_deleted']} deleted) "
+        f"in {totals['seconds']}s.",
+        file=sys.stderr,
+    )
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
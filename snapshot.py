@@ -0,0 +1,63 @@
+"""
+Export / import a prebuilt index snapshot (vectors, chunk texts, metadata, BM25 index).
+Run from project root, e.g.:
+    python snapshot.py export snapshot/ --collection reports
+    python snapshot.py import snapshot/ --verify-model
+    python snapshot.py info snapshot/
+The app loads SNAPSHOT_PATH (config.py, default ./snapshot) at startup if it exists.
+"""
+import argparse
+import json
+import sys
+
+from config import CHROMA_DIR, COLLECTION_NAME, EMBEDDING_MODEL, VECTOR_STORE_BACKEND
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export or import a portable index snapshot.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Write a collection to a snapshot directory")
+    export.add_argument("out_dir")
+    export.add_argument("--collection", default=COLLECTION_NAME)
+    export.add_argument("--dtype", default="float16", choices=["float16", "float32"], help="Vector precision on disk")
+
+    load = sub.add_parser("import", help="Replace a collection with a snapshot")
+    load.add_argument("snapshot_dir")
+    load.add_argument("--collection", default=None, help="Target collection (default: the exported one's name)")
+    load.add_argument("--verify-model", action="store_true", help="Re-embed the probe text to check the local model")
+
+    info = sub.add_parser("info", help="Show a snapshot's manifest")
+    info.add_argument("snapshot_dir")
+
+    for p in (export, load):
+        p.add_argument("--persist-dir", default=CHROMA_DIR)
+        p.add_argument("--backend", default=VECTOR_STORE_BACKEND, choices=["chroma", "numpy"])
+    for p in (export, load, info):
+        p.add_argument("--model", default=EMBEDDING_MODEL)
+    args = parser.parse_args(argv)
+
+    from components.snapshot import SnapshotError, export_snapshot, import_snapshot, read_manifest
+
+    try:
+        if args.command == "export":
+            manifest = export_snapshot(args.out_dir, args.collection, args.persist_dir, args.model, args.dtype, args.backend)
+            print(f"Exported {manifest['count']} chunks of {args.collection} to {args.out_dir} ({manifest['snapshot_id']}).", file=sys.stderr)
+        elif args.command == "import":
+            result = import_snapshot(
+                args.snapshot_dir, args.persist_dir, args.collection, args.model,
+                check_model=args.verify_model, backend=args.backend,
+            )
+            print(f"Imported {result['count']} chunks into {result['collection']} in {result['seconds']}s.", file=sys.stderr)
+        else:
+            manifest = read_manifest(args.snapshot_dir, args.model)
+            manifest["model"] = {k: v for k, v in manifest["model"].items() if k != "probe"}
+            print(json.dumps(manifest, indent=2))
+    except SnapshotError as e:
+        print(f"Rejected: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+from components import metrics
+from components.cleaning import clean_pages, clean_text
+
+
+def test_each_entry_point_records_one_span():
+    metrics.reset()
+    pages = [{"page": n, "text": f"Page  {n}\n\n\n\nbody   text"} for n in range(1, 6)]
+    cleaned = clean_pages(pages)
+    assert cleaned["text"] == clean_text("\n\n".join(p["text"] for p in pages))["text"]
+    stats = metrics.get_stats()
+    assert stats["clean"]["calls"] == 1 and stats["clean"]["items"] == 5
+    assert stats["clean_text"]["calls"] == 1  # the call above, not one per page
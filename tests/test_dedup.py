@@ -0,0 +1,30 @@
+from components.chunking import ChunkTable
+from components.dedup import dedup_chunks
+
+
+def test_dedup_returns_kept_rows_for_a_shared_text_table():
+    paragraphs = [
+        "Quarterly report page header with the company name and the date of filing",
+        "Revenue grew by twelve percent driven by strong demand in the services segment",
+        "Quarterly report page header with the company name and the date of filing",
+        "Operating costs fell as the new logistics contracts came into effect this year",
+    ]
+    text = " ".join(paragraphs)
+    spans, offset = [], 0
+    for paragraph in paragraphs:
+        spans.append((offset, offset + len(paragraph)))
+        offset += len(paragraph) + 1
+    table = ChunkTable(text, spans, [(0, 1), (spans[2][0], 2)])
+
+    deduped = dedup_chunks(table, threshold=0.9)
+    assert list(deduped["kept"]) == [0, 1, 3]
+    assert deduped["duplicates"] == {2: 0}
+
+    kept = table.select(deduped["kept"])
+    assert kept.text is table.text
+    assert [(c["index"], c["text"], c.get("page")) for c in kept] == [
+        (0, paragraphs[0], 1), (1, paragraphs[1], 1), (3, paragraphs[3], 2),
+    ]
+    # Selecting from a selection still reports the original chunk numbers
+    assert [c["index"] for c in kept.select([2])] == [3]
+    assert [c["index"] for c in kept[1:]] == [1, 3]
@@ -0,0 +1,30 @@
+import sqlite3
+
+import numpy as np
+
+from components import embedding_cache
+
+
+def _on_disk(path: str) -> tuple[int, int]:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()
+
+
+def test_running_totals_match_the_table_and_evict_below_the_cap(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    vectors = np.random.default_rng(0).standard_normal((300, 64)).astype(np.float32)  # 256 bytes each
+    texts = [f"chunk {i}" for i in range(300)]
+    embedding_cache.put_many("m", texts[:100], vectors[:100], path=path, max_mb=1)
+    embedding_cache.put_many("m", texts[50:150] + texts[:1], vectors[50:150].tolist() + [vectors[0]], path=path, max_mb=1)
+    stats = embedding_cache.get_stats(path)
+    assert (stats["entries"], stats["size_mb"]) == (150, round(150 * 256 / 2**20, 2))
+    assert _on_disk(path) == (150, 150 * 256)
+
+    # 0.05 MB holds 204 vectors: the cap evicts least recently used ones down to 90% of it
+    embedding_cache.get_many("m", texts[:10], path=path)  # recently used: kept
+    embedding_cache.put_many("m", texts[150:], vectors[150:], path=path, max_mb=0.05)
+    entries, nbytes = _on_disk(path)
+    assert nbytes <= 0.9 * 0.05 * 2**20 < nbytes + 256
+    assert embedding_cache.get_stats(path)["entries"] == entries
+    assert all(v is not None for v in embedding_cache.get_many("m", texts[:10], path=path))
+    assert embedding_cache.get_many("m", texts[10:11], path=path) == [None]
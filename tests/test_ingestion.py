@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from components.chunking import chunk_table
+from components.cleaning import clean_pages
+from components.ingestion import stream_chunks
+
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa"]
+
+
+def _cleaned_pages(pages: list[dict]) -> list[dict]:
+    """Per-page cleaned text, as ingest_pdf's clean stage produces it (empty pages dropped)."""
+    cleaned = [{"page": p["page"], "text": clean_pages([p])["text"]} for p in pages]
+    return [p for p in cleaned if p["text"]]
+
+
+def _random_pages(rng: random.Random) -> list[dict]:
+    pages = []
+    for number in range(1, rng.randint(1, 12) + 1):
+        length = rng.choice([0, 0, rng.randint(1, 40), rng.randint(1, 400)])
+        text = " ".join(rng.choice(WORDS) for _ in range(length))
+        pages.append({"page": number, "text": text})
+    return pages
+
+
+@pytest.mark.parametrize("overlap", [0, 7])
+def test_fixed_stream_chunks_match_chunk_table(overlap):
+    rng = random.Random(overlap)
+    for _ in range(300):
+        pages = _random_pages(rng)
+        chunk_size = rng.choice([20, 50, 100])
+        cleaned = clean_pages(pages)
+        expected = [
+            (c["index"], c["text"], c.get("page"))
+            for c in chunk_table(cleaned["text"], "fixed", chunk_size, overlap, cleaned["page_starts"])
+        ]
+        # Small segments force the buffer to be flushed, often exactly at a page end
+        streamed = [
+            (c["index"], c["text"], c.get("page"))
+            for c in stream_chunks(iter(_cleaned_pages(pages)), "fixed", chunk_size, overlap, segment_chars=chunk_size)
+        ]
+        assert streamed == expected
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+
+from benchmarks.azure_stub import start_stub
+from components import llm_azure
+from config import AZURE_OPENAI_MAX_CONCURRENCY
+
+pytest.importorskip("openai")
+
+
+@pytest.fixture
+def stub():
+    """Factory: start a stub server with the given options; all are shut down afterwards."""
+    servers = []
+
+    def start(**options):
+        server, url, state = start_stub(**options)
+        servers.append(server)
+        return {"endpoint": url, "api_key": "stub", "deployment": "stub"}, state
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_sync_answer(stub):
+    settings, state = stub()
+    timing = {}
+    answer, error = llm_azure.generate_with_azure("What is RAG?", "some context", **settings, timing=timing)
+    assert error is None
+    assert answer == "Stub answer to: What is RAG?"
+    assert state["requests"] == 1
+    assert timing["stream"] is False and timing["retries"] == 0
+
+
+def test_stream_tokens_and_time_to_first_token(stub):
+    settings, _ = stub(token_delay=0.05)
+    timing = {}
+    pieces = list(llm_azure.stream_with_azure("What is RAG?", "some context", **settings, timing=timing))
+    assert len(pieces) > 1
+    assert "".join(pieces) == "Stub answer to: What is RAG?"
+    assert timing["stream"] is True
+    # The first token arrives before the remaining ones (0.05s apart) have been sent
+    assert 0 < timing["ttft"] < timing["total"] - 0.05 * (len(pieces) - 2)
+
+
+def test_concurrent_streams_each_report_their_own_timing(stub):
+    slow, _ = stub(token_delay=0.1)
+    fast, _ = stub()
+    timings = {"slow": {}, "fast": {}}
+    calls_before = llm_azure.get_latency_stats()["calls"]
+
+    def consume(name, settings):
+        list(llm_azure.stream_with_azure("What is RAG?", "ctx", **settings, timing=timings[name]))
+
+    threads = [threading.Thread(target=consume, args=item) for item in (("slow", slow), ("fast", fast))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # The slow call is recorded last, yet each caller sees its own call's timing
+    assert timings["fast"]["total"] < 0.1 < timings["slow"]["total"]
+    assert llm_azure.get_latency_stats()["calls"] == calls_before + 2
+
+
+def test_concurrent_agenerate_respects_max_concurrency(stub):
+    settings, state = stub(response_delay=0.1)
+    questions = [f"question {i}" for i in range(AZURE_OPENAI_MAX_CONCURRENCY * 2 + 3)]
+
+    async def run():
+        return await asyncio.gather(*(llm_azure.agenerate_with_azure(q, "ctx", **settings) for q in questions))
+
+    results = asyncio.run(run())
+    assert [answer for answer, _ in results] == [f"Stub answer to: {q}" for q in questions]
+    assert all(error is None for _, error in results)
+    assert state["requests"] == len(questions)
+    assert 1 < state["max_in_flight"] <= AZURE_OPENAI_MAX_CONCURRENCY
+
+
+def test_rate_limited_request_is_retried(stub):
+    settings, state = stub(fail_first=1)
+    timing = {}
+    answer, error = llm_azure.generate_with_azure("What is RAG?", "some context", **settings, timing=timing)
+    assert error is None
+    assert answer == "Stub answer to: What is RAG?"
+    assert state["requests"] == 2
+    assert timing["retries"] == 1
@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from components import namespaces, snapshot
+from components.storage import get_collection
+from components.vector_store import write_numpy_collection
+
+MODEL = "test-model"
+
+
+def _fingerprint(probe):
+    return lambda model_name=MODEL: {"name": model_name, "dim": len(probe), "probe": list(probe)}
+
+
+@pytest.fixture
+def exported(tmp_path, monkeypatch):
+    """A 6-chunk snapshot exported from a numpy collection; returns (snapshot_dir, persist_dir)."""
+    persist_dir, out = str(tmp_path / "db"), str(tmp_path / "snapshot")
+    vectors = np.random.default_rng(0).standard_normal((6, 4)).astype(np.float32)
+    ids = [f"c{i}" for i in range(6)]
+    write_numpy_collection("reports", persist_dir, ids, vectors, ids, [{"source": "a.pdf"}] * 6)
+    monkeypatch.setattr(snapshot, "model_fingerprint", _fingerprint([1.0, 0.0, 0.0, 0.0]))
+    snapshot.export_snapshot(out, "reports", persist_dir, MODEL, backend="numpy")
+    return out, persist_dir
+
+
+def test_incomplete_snapshots_raise_snapshot_error(exported, tmp_path):
+    out, persist_dir = exported
+    with open(os.path.join(out, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    del manifest["model"]
+    with open(os.path.join(out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    with pytest.raises(snapshot.SnapshotError, match="model"):
+        snapshot.read_manifest(out, MODEL)
+
+    out2 = str(tmp_path / "other")
+    snapshot.export_snapshot(out2, "reports", persist_dir, MODEL, backend="numpy")
+    os.remove(os.path.join(out2, "chunks.json"))
+    with pytest.raises(snapshot.SnapshotError, match="chunks.json"):
+        snapshot.import_snapshot(out2, persist_dir, model_name=MODEL, backend="numpy")
+    # Nothing was deleted before the snapshot was found unusable
+    assert get_collection("reports", persist_dir, "numpy").count() == 6
+
+
+def test_verify_loaded_drops_a_snapshot_from_other_weights(exported, tmp_path, monkeypatch):
+    out, _ = exported
+    persist_dir = str(tmp_path / "app_db")  # loaded with the configured backend, as in the app
+    result = snapshot.ensure_loaded(out, persist_dir, MODEL)
+    assert namespaces.info("reports", persist_dir)["pinned"]
+    assert get_collection("reports", persist_dir).count() == 6
+
+    monkeypatch.setattr(snapshot, "model_fingerprint", _fingerprint([0.0, 1.0, 0.0, 0.0]))
+    snapshot.verify_loaded(out, persist_dir, MODEL)
+    assert result["verified"] is False
+    assert "differs" in result["error"]
+    assert not namespaces.exists("reports", persist_dir)
+    with pytest.raises(Exception):
+        get_collection("reports", persist_dir).count()
+    assert snapshot.ensure_loaded(out, persist_dir, MODEL) is result
+
+
+def test_load_async_reports_loading_until_the_import_finishes(exported, tmp_path, monkeypatch):
+    out, _ = exported
+    persist_dir = str(tmp_path / "app_db")
+    release = threading.Event()
+    import_snapshot = snapshot.import_snapshot
+
+    def slow_import(*args, **kwargs):
+        release.wait(10)
+        return import_snapshot(*args, **kwargs)
+
+    monkeypatch.setattr(snapshot, "import_snapshot", slow_import)
+    state = snapshot.load_async(out, persist_dir, MODEL)
+    assert state["status"] == "loading"
+    assert snapshot.load_async(out, persist_dir, MODEL) is state
+    release.set()
+    assert snapshot.ensure_loaded(out, persist_dir, MODEL) is state
+    assert state["status"] == "loaded" and state["imported"] and state["count"] == 6
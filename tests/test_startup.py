@@ -0,0 +1,16 @@
+from benchmarks.startup import HEAVY_MODULES, MAX_SECONDS, app_imports, measure
+
+
+def test_app_imports_are_fast_and_leave_heavy_dependencies_unloaded():
+    modules = app_imports()
+    assert "config" in modules and any(m.startswith("components.") for m in modules)
+    # Fresh interpreters: nothing the test process already imported can hide a regression.
+    # The fastest of a few runs counts, as in the benchmark, so a busy CI machine doesn't flake.
+    runs = [measure(modules) for _ in range(3)]
+    loaded = runs[0]["loaded"]
+    for name in ("torch", "chromadb", "pypdf", "openai", "tiktoken"):
+        assert name in HEAVY_MODULES
+        assert name not in loaded, f"{name} is imported at app startup"
+    assert loaded == []
+    best = min(r["seconds"] for r in runs)
+    assert best < MAX_SECONDS, f"importing app.py's modules took {best:.3f}s (budget {MAX_SECONDS}s)"
@@ -0,0 +1,69 @@
+import json
+import os
+
+import numpy as np
+
+from components.vector_store import NumpyCollection, collection_dir, open_numpy_collection
+
+
+def _vectors(n: int, dim: int = 8, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def _exact_ids(vectors: np.ndarray, ids: list[str], query: np.ndarray, k: int) -> list[str]:
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [ids[i] for i in np.argsort(-(normed @ query))[:k]]
+
+
+def test_batched_adds_append_instead_of_rewriting(tmp_path):
+    col = open_numpy_collection("c", str(tmp_path), create=True)
+    vectors = _vectors(640)
+    ids = [f"id{i}" for i in range(len(vectors))]
+    sizes = []
+    for start in range(0, len(ids), 64):
+        col.add(ids[start:start + 64], vectors[start:start + 64], documents=ids[start:start + 64])
+        vectors_file = os.path.join(collection_dir("c", str(tmp_path)), "vectors.f32")
+        sizes.append(os.path.getsize(vectors_file))
+    # Capacity is preallocated: the file is not rewritten at a new size for every batch
+    assert len(set(sizes)) == 1
+    assert col.count() == 640
+    query = _vectors(1, seed=1)[0]
+    found = col.query([query], n_results=5)["ids"][0]
+    assert found == _exact_ids(vectors, ids, query, 5)
+
+
+def test_update_delete_survive_reopen_and_compaction(tmp_path):
+    col = open_numpy_collection("c", str(tmp_path), create=True)
+    vectors = _vectors(3000)
+    ids = [f"id{i}" for i in range(len(vectors))]
+    col.add(ids, vectors, documents=ids, metadatas=[{"source": "a" if i % 2 else "b"} for i in range(len(ids))])
+    col.update(ids[:2], metadatas=[{"source": "moved"}] * 2)
+    col.delete(where={"source": "b"})
+    assert col.count() == 1501  # id0 moved away from "b" before the delete
+
+    reopened = NumpyCollection("c", collection_dir("c", str(tmp_path)))
+    assert reopened.count() == 1501
+    assert reopened.get(ids=["id0"], include=["metadatas"])["metadatas"] == [{"source": "moved"}]
+    assert reopened.get(ids=["id2"])["ids"] == []
+
+    # Deleting most rows compacts the files; search still matches brute force on what's left
+    reopened.delete(ids=ids[:2900])
+    with open(os.path.join(collection_dir("c", str(tmp_path)), "meta.jsonl"), encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+    left = [i for i in range(2900, 3000) if i % 2]
+    query = _vectors(1, seed=2)[0]
+    found = reopened.query([query], n_results=3)["ids"][0]
+    assert found == _exact_ids(vectors[left], [ids[i] for i in left], query, 3)
+
+
+def test_old_layout_is_migrated(tmp_path):
+    directory = collection_dir("old", str(tmp_path))
+    os.makedirs(directory)
+    vectors = _vectors(4)
+    np.save(os.path.join(directory, "vectors.npy"), vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"ids": list("abcd"), "documents": list("abcd"), "metadatas": [None] * 4}, f)
+    col = open_numpy_collection("old", str(tmp_path))
+    assert col.count() == 4
+    assert col.query([vectors[2]], n_results=1)["ids"] == [["c"]]
+    assert not os.path.exists(os.path.join(directory, "meta.json"))